@@ -1,8 +1,12 @@
+import asyncio
+from collections.abc import Callable
+import inspect
+from typing import Any, Final, Literal
+
 from nonebot import get_driver
 from nonebot.plugin import PluginMetadata
 
 from zhenxun.utils.manager.priority_manager import PriorityLifecycle
-from pathlib import Path
 from zhenxun.configs.utils import PluginExtraData, RegisterConfig
 from zhenxun.services.log import logger
 from .command.manage_commands import quote_manage_cmd  # noqa: F401
@@ -15,13 +19,59 @@ from .command.upload_commands import (  # noqa: F401
     make_record_cmd,
     save_img_cmd,
 )
-from .config import ensure_quote_path
+from .config import QUOTE_ASSETS_PATH, ensure_quote_path
+from .services import OCRService, QuoteService, ViewCountService
 from zhenxun.services import renderer_service
 
 ensure_quote_path()
 driver = get_driver()
 
-QUOTE_ASSETS_PATH = Path(__file__).parent / "templates"
+_background_tasks: set[asyncio.Task] = set()
+
+
+_LifecycleHook = Callable[[], Any]
+
+_LIFECYCLE_HOOKS: Final[
+    dict[Literal["startup", "shutdown"], tuple[tuple[str, _LifecycleHook], ...]]
+] = {
+    "startup": (
+        ("OCR服务", OCRService.warmup),
+        ("路径迁移", QuoteService.migrate_legacy_paths),
+    ),
+    "shutdown": (
+        ("OCR服务", OCRService.shutdown),
+        ("查看次数", ViewCountService.shutdown),
+    ),
+}
+_PHASE_NAMES: Final[dict[Literal["startup", "shutdown"], str]] = {
+    "startup": "初始化",
+    "shutdown": "关闭",
+}
+
+
+async def _run_service_hook(name: str, hook: _LifecycleHook, phase_name: str) -> str:
+    """执行单个服务的生命周期方法，返回执行结果"""
+    try:
+        result = hook()
+        if inspect.isawaitable(result):
+            await result
+        return "完成"
+    except Exception as e:
+        logger.error(f"{name}{phase_name}失败: {e}", "群聊语录", e=e)
+        return "失败"
+
+
+async def _run_lifecycle(phase: Literal["startup", "shutdown"]):
+    """并发执行各服务在指定阶段的生命周期方法"""
+    phase_name = _PHASE_NAMES[phase]
+    hooks = _LIFECYCLE_HOOKS[phase]
+    statuses = await asyncio.gather(
+        *(_run_service_hook(name, hook, phase_name) for name, hook in hooks)
+    )
+    results = {name: status for (name, _), status in zip(hooks, statuses)}
+
+    if results:
+        logger.info(f"语录插件服务{phase_name}: {results}", "群聊语录")
 
 
 @PriorityLifecycle.on_startup(priority=9)
@@ -29,38 +79,29 @@ async def _init_quote_services():
     """
     初始化语录插件服务。
     必须在 RendererService (priority=10) 之前注册模板命名空间。
+    其余服务在后台预热，不阻塞启动流程。
     """
-    try:
-        renderer_service.register_template_namespace("@quote", QUOTE_ASSETS_PATH)
-        logger.info("语录插件模板命名空间 '@quote' 注册成功。", "群聊语录")
-    except Exception as e:
-        logger.error(f"注册语录插件模板命名空间失败: {e}", "群聊语录", e=e)
-
-    try:
-        from .services.ocr_service import OCRService
+    if not QUOTE_ASSETS_PATH.is_dir():
+        logger.error(f"语录插件模板目录不存在: {QUOTE_ASSETS_PATH}", "群聊语录")
+    else:
+        try:
+            renderer_service.register_template_namespace("@quote", QUOTE_ASSETS_PATH)
+            logger.info("语录插件模板命名空间 '@quote' 注册成功。", "群聊语录")
+        except Exception as e:
+            logger.error(f"注册语录插件模板命名空间失败: {e}", "群聊语录", e=e)
 
-        await OCRService.initialize_engine()
-        logger.info("OCR服务初始化完成", "群聊语录")
-    except Exception as e:
-        logger.error(f"OCR服务初始化失败: {e}", "群聊语录", e=e)
+    task = asyncio.create_task(_run_lifecycle("startup"))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
 
 @driver.on_shutdown
 async def shutdown_services():
     """关闭"""
-    try:
-        from .services.ocr_service import OCRService
+    await _run_lifecycle("shutdown")
 
-        OCRService.shutdown()
-        logger.info("OCR服务已关闭", "群聊语录")
-    except Exception as e:
-        logger.error(f"OCR服务关闭失败: {e}", "群聊语录", e=e)
 
-
-__plugin_meta__ = PluginMetadata(
-    name="群聊语录",
-    description="一款QQ群语录库——支持上传聊天截图为语录，随机投放语录，关键词搜索语录精准投放",
-    usage="""### 📷 核心功能
+_USAGE: Final[str] = """### 📷 核心功能
 `语录` `[*关键词*]` `[*@用户*]`
 > 随机发送一条语录。可提供关键词或@用户筛选。
 > **示例**: `语录` / `语录 白丝` / `语录 @小真寻`
@@ -100,85 +141,101 @@ __plugin_meta__ = PluginMetadata(
 
 `语录管理 cleanup`
 > 清理已退群用户的相关语录。 (超级用户)
-    """,
+"""
+
+_CONFIGS: Final[tuple[RegisterConfig, ...]] = (
+    RegisterConfig(
+        module="quote",
+        key="OCR_ENGINE",
+        value="easyocr",
+        help="OCR引擎选择，可选值: easyocr, paddleocr",
+        default_value="easyocr",
+    ),
+    RegisterConfig(
+        module="quote",
+        key="OCR_USE_GPU",
+        value=True,
+        help="是否使用GPU加速OCR识别",
+        default_value=True,
+    ),
+    RegisterConfig(
+        module="quote",
+        key="AI_ENABLED",
+        value=True,
+        help="是否启用AI识别功能（启用后会先尝试使用AI识别，失败则降级使用OCR）",
+        default_value=True,
+    ),
+    RegisterConfig(
+        module="quote",
+        key="OCR_AI_MODEL",
+        value="Gemini/gemini-2.5-flash-lite-preview-06-17",
+        help="用于OCR的、支持视觉功能的AI模型全名 (格式: Provider/ModelName)",
+        default_value="Gemini/gemini-2.5-flash-lite-preview-06-17",
+    ),
+    RegisterConfig(
+        module="quote",
+        key="QUOTE_PATH",
+        value="",
+        help="语录图片保存路径（留空则使用默认路径：DATA_PATH/quote/images）",
+        default_value="",
+    ),
+    RegisterConfig(
+        module="quote",
+        key="THEME",
+        value="qq-native",
+        help="生成语录卡片时默认使用的主题/皮肤名称。",
+        default_value="qq-native",
+    ),
+    RegisterConfig(
+        module="quote",
+        key="QUOTE_TEXT_ONLY_THEME",
+        value="",
+        help="仅用于纯文本（可包含@）的单条语录的主题。留空则默认使用 THEME。",
+        default_value="",
+    ),
+    RegisterConfig(
+        module="quote",
+        key="QUOTE_ALLOW_SELF_RECORD",
+        value=False,
+        help="是否允许用户使用「记录」命令记录自己的消息。",
+        default_value=False,
+    ),
+    RegisterConfig(
+        module="quote",
+        key="QUOTE_ALLOW_BOT_RECORD",
+        value=False,
+        help="是否允许记录Bot本身发送的消息。",
+        default_value=False,
+    ),
+    RegisterConfig(
+        module="quote",
+        key="QUOTE_CACHE_MAX_BYTES",
+        value=104857600,
+        help="语录卡片渲染缓存的最大占用空间（字节），超出后按最近访问时间淘汰。",
+        default_value=104857600,
+    ),
+    RegisterConfig(
+        module="quote",
+        key="DELETE_ADMIN_LEVEL",
+        value=5,
+        help="设置使用「删除」命令所需的权限等级。默认值为5，允许群管理员使用。",
+        default_value=5,
+    ),
+)
+
+_EXTRA: Final[dict] = PluginExtraData(
+    author="webjoin111",
+    version="v1.1.6",
+    admin_level=0,
+    configs=list(_CONFIGS),
+).to_dict()
+
+__plugin_meta__ = PluginMetadata(
+    name="群聊语录",
+    description="一款QQ群语录库——支持上传聊天截图为语录，随机投放语录，关键词搜索语录精准投放",
+    usage=_USAGE,
     type="application",
     homepage="https://github.com/webjoin111/zhenxun_plugin_quote",
     supported_adapters={"~onebot.v11"},
-    extra=PluginExtraData(
-        author="webjoin111",
-        version="v1.1.6",
-        admin_level=0,
-        configs=[
-            RegisterConfig(
-                module="quote",
-                key="OCR_ENGINE",
-                value="easyocr",
-                help="OCR引擎选择，可选值: easyocr, paddleocr",
-                default_value="easyocr",
-            ),
-            RegisterConfig(
-                module="quote",
-                key="OCR_USE_GPU",
-                value=True,
-                help="是否使用GPU加速OCR识别",
-                default_value=True,
-            ),
-            RegisterConfig(
-                module="quote",
-                key="AI_ENABLED",
-                value=True,
-                help="是否启用AI识别功能（启用后会先尝试使用AI识别，失败则降级使用OCR）",
-                default_value=True,
-            ),
-            RegisterConfig(
-                module="quote",
-                key="OCR_AI_MODEL",
-                value="Gemini/gemini-2.5-flash-lite-preview-06-17",
-                help="用于OCR的、支持视觉功能的AI模型全名 (格式: Provider/ModelName)",
-                default_value="Gemini/gemini-2.5-flash-lite-preview-06-17",
-            ),
-            RegisterConfig(
-                module="quote",
-                key="QUOTE_PATH",
-                value="",
-                help="语录图片保存路径（留空则使用默认路径：DATA_PATH/quote/images）",
-                default_value="",
-            ),
-            RegisterConfig(
-                module="quote",
-                key="THEME",
-                value="qq-native",
-                help="生成语录卡片时默认使用的主题/皮肤名称。",
-                default_value="qq-native",
-            ),
-            RegisterConfig(
-                module="quote",
-                key="QUOTE_TEXT_ONLY_THEME",
-                value="",
-                help="仅用于纯文本（可包含@）的单条语录的主题。留空则默认使用 THEME。",
-                default_value="",
-            ),
-            RegisterConfig(
-                module="quote",
-                key="QUOTE_ALLOW_SELF_RECORD",
-                value=False,
-                help="是否允许用户使用「记录」命令记录自己的消息。",
-                default_value=False,
-            ),
-            RegisterConfig(
-                module="quote",
-                key="QUOTE_ALLOW_BOT_RECORD",
-                value=False,
-                help="是否允许记录Bot本身发送的消息。",
-                default_value=False,
-            ),
-            RegisterConfig(
-                module="quote",
-                key="DELETE_ADMIN_LEVEL",
-                value=5,
-                help="设置使用「删除」命令所需的权限等级。默认值为5，允许群管理员使用。",
-                default_value=5,
-            ),
-        ],
-    ).dict(),
+    extra=_EXTRA,
 )
@@ -1,4 +1,6 @@
+import asyncio
 import os
+from pathlib import Path
 from typing import Optional, Literal, Union
 from nonebot.permission import SUPERUSER
 from arclet.alconna import Alconna, Args, Arparma, MultiVar, Option, Subcommand
@@ -17,18 +19,18 @@ from nonebot_plugin_waiter import waiter
 from zhenxun.configs.config import Config
 from zhenxun.services.log import logger
 from zhenxun.utils.message import MessageUtils
-from zhenxun.utils.platform import PlatformUtils
 from zhenxun.utils.rules import admin_check
 
 from ..config import resolve_quote_image_path
 from ..services.quote_service import QuoteService
-from ..config import QUOTE_ASSETS_PATH
+from ..config import QUOTE_COMPONENTS_PATH
+from ..utils import get_cached_target, safe_unlink
 
 
 async def _get_image_from_reply(event: Event, bot: Bot) -> Optional[Image]:
     """
     从回复消息中提取图片。
-    此函数总是通过API获取消息详情，并直接解析返回的原始数据。
+    此函数通过API获取消息详情，并直接解析返回的原始数据。
     """
     if not (reply := await reply_fetch(event, bot)):
         return None
@@ -51,45 +53,56 @@ async def _get_image_from_reply(event: Event, bot: Bot) -> Optional[Image]:
     if not raw_message_data:
         logger.debug(f"通过 API get_msg(id={reply.id}) 获取到的消息内容为空。")
         return None
+    if isinstance(raw_message_data, str):
+        logger.debug(f"获取到的消息内容为字符串，不含图片: {raw_message_data}")
+        return None
+    if image_data := _find_image_segment(raw_message_data):
+        return Image(id=image_data.get("file"), url=image_data.get("url"))
+    return None
 
-    segment_dicts = []
+
+def _find_image_segment(raw_message_data: object) -> dict | None:
+    """在 get_msg 返回的原始消息段中查找第一个图片段，返回其 data 字典"""
     if isinstance(raw_message_data, dict):
-        segment_dicts.append(raw_message_data)
+        segment_dicts = (raw_message_data,)
     elif isinstance(raw_message_data, list):
         segment_dicts = raw_message_data
     else:
-        logger.debug(f"获取到的消息内容为字符串，不含图片: {raw_message_data}")
         return None
 
-    for seg_dict in segment_dicts:
-        if isinstance(seg_dict, dict) and seg_dict.get("type") == "image":
-            data = seg_dict.get("data", {})
-            return Image(id=data.get("file"), url=data.get("url"))
+    image_seg = next(
+        (
+            seg_dict
+            for seg_dict in segment_dicts
+            if type(seg_dict) is dict and seg_dict.get("type") == "image"
+        ),
+        None,
+    )
+    return (image_seg.get("data") or {}) if image_seg is not None else None
 
-    return None
+
+def _path_basename(path: str) -> str:
+    """取路径或图片ID的最后一段，兼容正反斜杠分隔"""
+    return path.rpartition("/")[2].rpartition("\\")[2]
 
 
 async def uploader_or_admin_check(
-    bot: Bot, event: MessageEvent, session: Uninfo
+    bot: Bot, event: MessageEvent, session: Uninfo, image_seg: Image
 ) -> bool:
     """
     检查执行删除操作的用户是否为语录上传者，或者是满足配置权限的管理员。
+    image_seg 为调用方已从回复中取得的图片，管理员检查在前，满足时无需查询数据库。
     """
     if await admin_check("quote", "DELETE_ADMIN_LEVEL")(bot, event, session):
         return True
 
-    if session.group:
-        group_id = session.group.id
-        user_id = session.user.id
-        if image_seg := await _get_image_from_reply(event, bot):
-            if image_seg.id:
-                image_basename = os.path.basename(image_seg.id)
-                quote = await QuoteService.find_quote_by_basename(
-                    group_id, image_basename
-                )
-                if quote and quote.uploader_user_id == user_id:
-                    return True
-    return False
+    if not session.group or not image_seg.id:
+        return False
+
+    image_basename = _path_basename(image_seg.id)
+    return await QuoteService.is_quote_uploader(
+        session.group.id, image_basename, session.user.id
+    )
 
 
 async def is_reply_to_bot(event: Event) -> bool:
@@ -97,13 +110,11 @@ async def is_reply_to_bot(event: Event) -> bool:
     if not isinstance(event, MessageEvent):
         return False
 
-    reply = getattr(event, "reply", None)
-    sender = getattr(reply, "sender", None) if reply else None
-    sender_id = getattr(sender, "user_id", None) if sender else None
-
-    return sender_id is not None and str(sender_id) == str(
-        getattr(event, "self_id", "")
-    )
+    # OneBot v11 模型中 sender.user_id 与 self_id 均为 int，可直接比较
+    try:
+        return event.reply.sender.user_id == event.self_id  # type: ignore[union-attr]
+    except AttributeError:
+        return False
 
 
 delete_quote_cmd = on_alconna(Alconna("删除"), aliases={"del"}, priority=11, block=True)
@@ -124,18 +135,18 @@ async def handle_delete_quote_standalone(
     is_reply = await is_reply_to_bot(event)
 
     if is_reply:
-        if not await uploader_or_admin_check(bot, event, session):
-            await delete_quote_cmd.finish()
-
         if not (image_seg := await _get_image_from_reply(event, bot)):
             logger.debug("回复的消息中未找到图片，无法执行删除操作。", "群聊语录")
             return
 
+        if not await uploader_or_admin_check(bot, event, session, image_seg):
+            await delete_quote_cmd.finish()
+
         if not image_seg.id:
             logger.warning("无法获取到回复图片的唯一标识，删除失败。", "群聊语录")
             return
 
-        image_basename = os.path.basename(image_seg.id)
+        image_basename = _path_basename(image_seg.id)
         is_deleted = await QuoteService.delete_quote(group_id, image_basename)
     else:
         if not await admin_check("quote", "DELETE_ADMIN_LEVEL")(bot, event, session):
@@ -146,7 +157,7 @@ async def handle_delete_quote_standalone(
             await MessageUtils.build_message("本群语录库为空").send()
             return
 
-        image_basename = os.path.basename(quote.image_path)
+        image_basename = _path_basename(quote.image_path)
         is_deleted = await QuoteService.delete_quote(group_id, image_basename)
 
     if is_deleted:
@@ -208,31 +219,93 @@ async def _(bot: Bot, event: MessageEvent, arp: Arparma, session: Uninfo):
         await handle_theme(bot, event, arp, session)
 
 
+# 组件目录随插件一同安装，进程生命周期内只需检查一次
+_COMPONENTS_ROOT_VALID = QUOTE_COMPONENTS_PATH.is_dir()
+
+# (排序后的主题列表, 主题集合, 展示用文本)
+_ThemeInfo = tuple[list[str], frozenset[str], str]
+# (目录修改时间签名, 被监视的目录, 主题信息)
+_theme_cache: tuple[tuple[int, ...], list[Path], _ThemeInfo] | None = None
+
+
+def _dir_mtimes(dirs: list[Path]) -> tuple[int, ...] | None:
+    """获取一组目录的修改时间，任一目录不可访问时返回 None"""
+    try:
+        return tuple(d.stat().st_mtime_ns for d in dirs)
+    except OSError:
+        return None
+
+
+def _load_themes() -> _ThemeInfo:
+    """
+    扫描所有可用的语录主题，返回排序后的列表、用于成员判断的集合以及逗号连接的展示文本。
+    结果按组件根目录、各组件目录及已有 skins 目录的修改时间缓存，目录未变化时不重新扫描。
+    监视各组件目录本身，组件新增 skins 目录时也能察觉。
+    """
+    global _theme_cache
+    if not _COMPONENTS_ROOT_VALID:
+        return [], frozenset(), ""
+
+    if _theme_cache is not None:
+        signature, watched_dirs, theme_info = _theme_cache
+        if _dir_mtimes(watched_dirs) == signature:
+            return theme_info
+
+    available_themes_set = set()
+    watched_dirs = [QUOTE_COMPONENTS_PATH]
+    try:
+        with os.scandir(QUOTE_COMPONENTS_PATH) as components:
+            component_entries = [entry for entry in components if entry.is_dir()]
+    except OSError:
+        component_entries = []
+
+    for component_entry in component_entries:
+        available_themes_set.add(component_entry.name)
+        watched_dirs.append(Path(component_entry.path))
+
+        skins_dir = Path(component_entry.path) / "skins"
+        try:
+            with os.scandir(skins_dir) as skins:
+                available_themes_set.update(
+                    entry.name for entry in skins if entry.is_dir()
+                )
+            watched_dirs.append(skins_dir)
+        except OSError:
+            continue
+
+    themes = sorted(available_themes_set)
+    theme_info = (themes, frozenset(themes), ", ".join(themes))
+    if (signature := _dir_mtimes(watched_dirs)) is not None:
+        _theme_cache = (signature, watched_dirs, theme_info)
+    return theme_info
+
+
 def get_available_themes() -> list[str]:
     """获取所有可用的语录主题，并确保排序。"""
-    available_themes_set = set()
-    components_root = QUOTE_ASSETS_PATH / "components"
-    if components_root.exists() and components_root.is_dir():
-        for component_dir in components_root.iterdir():
-            if component_dir.is_dir():
-                available_themes_set.add(component_dir.name)
+    return _load_themes()[0]
+
 
-                skins_dir = component_dir / "skins"
-                if skins_dir.exists() and skins_dir.is_dir():
-                    for skin_dir in skins_dir.iterdir():
-                        if skin_dir.is_dir():
-                            available_themes_set.add(skin_dir.name)
+def get_available_theme_set() -> frozenset[str]:
+    """获取所有可用语录主题的集合，用于快速判断主题是否存在。"""
+    return _load_themes()[1]
 
-    return sorted(list(available_themes_set))
+
+def parse_theme_index(value: str) -> int | None:
+    """
+    将用户输入解析为主题序号，非序号输入返回 None。
+    主题数量很少，超过4位的输入直接视为主题名，避免对长字符串做完整扫描。
+    """
+    if len(value) > 4 or not (value.isascii() and value.isdigit()):
+        return None
+    return int(value)
 
 
 async def handle_theme(bot: Bot, event: MessageEvent, arp: Arparma, session: Uninfo):
     """处理 'quote theme' 命令"""
     theme_name_or_index: str | None = arp.query("theme.theme_name")
 
-    available_themes = get_available_themes()
-
     if not theme_name_or_index:
+        available_themes = get_available_themes()
         message_parts = [
             "可用的语录主题列表 (使用 `quote theme [主题名/序号]` 切换):"
         ] + [f"{i + 1}. {th}" for i, th in enumerate(available_themes)]
@@ -240,23 +313,56 @@ async def handle_theme(bot: Bot, event: MessageEvent, arp: Arparma, session: Uni
         return
 
     theme_name = theme_name_or_index
-    if theme_name and theme_name.isdigit():
-        try:
-            theme_index = int(theme_name)
-            if 1 <= theme_index <= len(available_themes):
-                theme_name = available_themes[theme_index - 1]
-        except (ValueError, IndexError):
-            pass
+    if (theme_index := parse_theme_index(theme_name)) is not None:
+        available_themes = get_available_themes()
+        if 1 <= theme_index <= len(available_themes):
+            theme_name = available_themes[theme_index - 1]
 
-    if theme_name in available_themes:
+    if theme_name in get_available_theme_set():
         Config.set_config("quote", "THEME", theme_name, auto_save=True)
         await quote_manage_cmd.finish(f"语录主题已切换为: {theme_name}")
     else:
         await quote_manage_cmd.finish(
-            f"主题 '{theme_name_or_index}' 不存在。可用主题有: {', '.join(sorted(available_themes))}"
+            f"主题 '{theme_name_or_index}' 不存在。可用主题有: {_load_themes()[2]}"
         )
 
 
+_UNLINK_CONCURRENCY = 16  # 批量删除时同时进行的图片文件删除数量上限
+
+_NOT_FOUND_MSG = "未找到{}语录"
+_CONFIRM_MSG = "在群 {} 中找到 {} 条{}语录，确认删除请回复'是'，取消请回复其他内容"
+_CANCELLED_MSG = "操作已取消"
+_RESULT_MSG = "语录删除完成，成功: {}，失败: {}"
+
+_CLEAR_OPTIONS: dict[str, tuple[str | None, str]] = {
+    # 选项名: (查询字段，None 表示按群组清空, 确认提示前缀)
+    "uploader": ("uploader_user_id", "由用户 {} 上传的全部"),
+    "quoted": ("quoted_user_id", "关于用户 {} 的全部"),
+    "group": (None, "群组 {} 的全部"),
+}
+
+
+def _extract_user_id(param: Union[At, int, str]) -> str:
+    """将 At 段或QQ号参数统一转换为用户ID字符串"""
+    return str(param.target) if isinstance(param, At) else str(param)
+
+
+def _parse_group_id(value: str) -> str | None:
+    """校验群组ID参数，只接受ASCII数字，否则返回 None"""
+    return value if value.isascii() and value.isdigit() else None
+
+
+def _resolve_user_filter(
+    uploader_param: Union[At, int, None], quoted_param: Union[At, int, None]
+) -> dict[str, str]:
+    """将 --uploader/--quoted 参数转换为查询过滤条件，两者同时提供时以上传者为准"""
+    if uploader_param:
+        return {"uploader_user_id": _extract_user_id(uploader_param)}
+    if quoted_param:
+        return {"quoted_user_id": _extract_user_id(quoted_param)}
+    return {}
+
+
 async def handle_adv_delete(
     bot: Bot, event: MessageEvent, arp: Arparma, session: Uninfo
 ):
@@ -268,15 +374,12 @@ async def handle_adv_delete(
         return
     group_id = session.group.id
 
-    target_for_reply = PlatformUtils.get_target(
+    target_for_reply = get_cached_target(
         group_id=group_id, user_id=current_user_id
-    )
-    if not target_for_reply:
-        target_for_reply = PlatformUtils.get_target(user_id=current_user_id)
+    ) or get_cached_target(user_id=current_user_id)
 
-    matched_quotes = []
+    matched_quotes: list[tuple[int, str]] = []
     confirm_msg_prefix = ""
-    user_filter_id: str | None = None
 
     if arp.find("manager.keyword"):
         keywords: list[str] = arp.query("manager.keyword.keywords", [])
@@ -288,30 +391,8 @@ async def handle_adv_delete(
         )
         quoted_param: Union[At, int, None] = arp.query("manager.keyword.quoted.user_id")
 
-        user_filter_id = None
-        user_filter_type = None
-
-        if uploader_param:
-            user_filter_id = (
-                str(uploader_param.target)
-                if isinstance(uploader_param, At)
-                else str(uploader_param)
-            )
-            user_filter_type = "uploader_user_id"
-        elif quoted_param:
-            user_filter_id = (
-                str(quoted_param.target)
-                if isinstance(quoted_param, At)
-                else str(quoted_param)
-            )
-            user_filter_type = "quoted_user_id"
-
-        user_filter_kwargs = (
-            {user_filter_type: user_filter_id} if user_filter_type else {}
-        )
-
         matched_quotes = await QuoteService.search_quotes_for_deletion(
-            group_id, keywords, **user_filter_kwargs
+            group_id, keywords, **_resolve_user_filter(uploader_param, quoted_param)
         )
         confirm_msg_prefix = f"与关键词 '{' 或 '.join(keywords)}' 相关的"
 
@@ -322,93 +403,89 @@ async def handle_adv_delete(
         quoted_param: Union[At, int, None] = arp.query("manager.clear.quoted.user_id")
         group_to_clear: str | None = arp.query("manager.clear.group.group_id")
 
-        if uploader_param:
-            user_filter_id = (
-                str(uploader_param.target)
-                if isinstance(uploader_param, At)
-                else str(uploader_param)
-            )
-            matched_quotes = await QuoteService.search_quotes_for_deletion(
-                group_id, keywords=None, uploader_user_id=user_filter_id
-            )
-            confirm_msg_prefix = f"由用户 {user_filter_id} 上传的全部"
-        elif quoted_param:
-            user_filter_id = (
-                str(quoted_param.target)
-                if isinstance(quoted_param, At)
-                else str(quoted_param)
-            )
-            matched_quotes = await QuoteService.search_quotes_for_deletion(
-                group_id, keywords=None, quoted_user_id=user_filter_id
+        clear_params = {
+            "uploader": uploader_param,
+            "quoted": quoted_param,
+            "group": group_to_clear,
+        }
+        option, param = next(
+            ((opt, p) for opt, p in clear_params.items() if p), (None, None)
+        )
+        if option is None:
+            await quote_manage_cmd.finish(
+                "使用 '清空全部' 子命令时，必须提供 --uploader, --quoted, 或 --group 中的一个选项。"
             )
-            confirm_msg_prefix = f"关于用户 {user_filter_id} 的全部"
-        elif group_to_clear:
+
+        filter_field, prefix_fmt = _CLEAR_OPTIONS[option]
+        if filter_field:
+            filter_value = _extract_user_id(param)
             matched_quotes = await QuoteService.search_quotes_for_deletion(
-                group_to_clear
+                group_id, keywords=None, **{filter_field: filter_value}
             )
-            confirm_msg_prefix = f"群组 {group_to_clear} 的全部"
         else:
-            await quote_manage_cmd.finish(
-                "使用 '清空全部' 子命令时，必须提供 --uploader, --quoted, 或 --group 中的一个选项。"
-            )
+            filter_value = _parse_group_id(param)
+            if filter_value is None:
+                await quote_manage_cmd.finish("指定的群组ID必须是数字")
+            matched_quotes = await QuoteService.search_quotes_for_deletion(filter_value)
+        confirm_msg_prefix = prefix_fmt.format(filter_value)
 
     elif arp.find("manager.cleanup"):
         matched_quotes = await QuoteService.find_quotes_from_left_users(group_id, bot)
         confirm_msg_prefix = "由已退群用户产生或记录的"
 
     if not matched_quotes:
-        await MessageUtils.build_message(f"未找到{confirm_msg_prefix}语录").send(
-            target=target_for_reply, bot=bot
-        )
+        await MessageUtils.build_message(
+            _NOT_FOUND_MSG.format(confirm_msg_prefix)
+        ).send(target=target_for_reply, bot=bot)
         return
 
     count = len(matched_quotes)
-    confirm_msg_text = (
-        f"在群 {group_id} 中找到 {count} 条{confirm_msg_prefix}语录，"
-        f"确认删除请回复'是'，取消请回复其他内容"
-    )
+    confirm_msg_text = _CONFIRM_MSG.format(group_id, count, confirm_msg_prefix)
 
     await MessageUtils.build_message(confirm_msg_text).send(
         target=target_for_reply, bot=bot
     )
 
+    # keep_session 会在调度前过滤掉其他会话（群号+用户）的消息
     @waiter(waits=["message"], keep_session=True)
     async def check_confirm(event: MessageEvent):
-        if (
-            event.get_session_id() != event.get_session_id()
-            or str(event.get_user_id()) != current_user_id
-        ):
-            return None
         return event.get_plaintext().strip()
 
     try:
         reply_text = await check_confirm.wait(timeout=30)
 
         if reply_text is None or reply_text != "是":
-            await MessageUtils.build_message("操作已取消").send(
+            await MessageUtils.build_message(_CANCELLED_MSG).send(
                 target=target_for_reply, bot=bot
             )
             return
 
-        deleted_count = 0
-        failed_count = 0
-
-        for quote in matched_quotes:
-            try:
-                absolute_image_path = resolve_quote_image_path(quote.image_path)
-                if os.path.exists(absolute_image_path):
-                    os.remove(absolute_image_path)
-                await quote.delete()
-                deleted_count += 1
-            except Exception as e:
+        unlink_semaphore = asyncio.Semaphore(_UNLINK_CONCURRENCY)
+
+        async def _unlink_image(image_path: str) -> None:
+            async with unlink_semaphore:
+                await safe_unlink(resolve_quote_image_path(image_path))
+
+        unlink_results = await asyncio.gather(
+            *(_unlink_image(image_path) for _, image_path in matched_quotes),
+            return_exceptions=True,
+        )
+
+        removable_ids: list[int] = []
+        for (quote_id, image_path), result in zip(matched_quotes, unlink_results):
+            if isinstance(result, Exception):
                 logger.error(
-                    f"删除语录失败 - ID: {quote.id}, 路径: {quote.image_path}, 错误: {e}",
+                    f"删除语录图片失败 - ID: {quote_id}, 路径: {image_path}, 错误: {result}",
                     "群聊语录",
-                    e=e,
+                    e=result,
                 )
-                failed_count += 1
+            else:
+                removable_ids.append(quote_id)
+
+        deleted_count = await QuoteService.bulk_delete_by_ids(removable_ids)
+        failed_count = count - deleted_count
 
-        result_msg = f"语录删除完成，成功: {deleted_count}，失败: {failed_count}"
+        result_msg = _RESULT_MSG.format(deleted_count, failed_count)
         await MessageUtils.build_message(result_msg).send(
             target=target_for_reply, bot=bot
         )
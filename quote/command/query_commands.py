@@ -1,4 +1,10 @@
+import asyncio
+import functools
+import time
+from collections.abc import Awaitable, Callable
+
 import aiofiles
+from cachetools import TTLCache
 from arclet.alconna import Alconna, Args, Arparma, Subcommand, MultiVar
 from nonebot.adapters.onebot.v11 import Bot, Event
 from nonebot.typing import T_State
@@ -7,14 +13,12 @@ from nonebot_plugin_alconna.uniseg import UniMessage
 
 from zhenxun.services.log import logger
 from zhenxun.utils.message import MessageUtils
-from zhenxun.utils.platform import PlatformUtils
 
-from ..config import (
-    safe_file_exists,
-    resolve_quote_image_path,
-)
+from ..config import resolve_quote_image_path
 from ..model import Quote
 from ..services.quote_service import QuoteService
+from ..services.view_count_service import ViewCountService
+from ..utils import get_cached_target, get_group_id_from_session
 
 quote_alc = Alconna("语录", Args["target_user?", At]["search_keywords?", MultiVar(str)])
 record_pool = on_alconna(quote_alc, priority=2, block=True)
@@ -32,35 +36,91 @@ quote_stats_cmd = on_alconna(stats_alc, priority=5, block=True)
 quote_stats_cmd.shortcut("语录统计", {"args": ["stats"]})
 
 
+_QUERY_CONCURRENCY = 16  # 同时进行的语录查询（数据库与图片读取）数量上限
+_STATS_CONCURRENCY = 4  # 同时进行的统计图生成数量上限
+
+_query_semaphore = asyncio.Semaphore(_QUERY_CONCURRENCY)
+_stats_semaphore = asyncio.Semaphore(_STATS_CONCURRENCY)
+
+
+async def _read_quote_image(quote: Quote) -> bytes | None:
+    """
+    读取语录图片，文件确实不存在时返回 None。
+    权限不足、IO错误等其他 OSError 可能只是暂时的，记录日志后继续抛出，由调用方跳过该条语录。
+    """
+    try:
+        async with aiofiles.open(resolve_quote_image_path(quote.image_path), "rb") as f:
+            return await f.read()
+    except (FileNotFoundError, IsADirectoryError) as e:
+        logger.warning(
+            f"数据库中的语录 (ID: {quote.id}) 对应的图片文件不存在: "
+            f"{quote.image_path}, 错误: {e}",
+            "群聊语录",
+        )
+        return None
+    except OSError as e:
+        logger.warning(
+            f"数据库中的语录 (ID: {quote.id}) 对应的图片文件暂时无法读取，跳过: "
+            f"{quote.image_path}, 错误: {e}",
+            "群聊语录",
+        )
+        raise
+
+
 async def _get_valid_quote(
     group_id: str,
     user_id_filter: str | None = None,
-    keyword: str | None = None,
+    keywords: list[str] | None = None,
     max_retries: int = 3,
-) -> Quote | None:
+) -> tuple[Quote, bytes] | None:
     """
-    安全地获取一条有效的语录。
-    该函数会检查语录对应的图片文件是否存在，如果不存在，则删除该条记录并尝试重新获取。
+    安全地获取一条有效的语录及其图片数据。
+    直接尝试读取语录对应的图片，文件不存在时删除该条记录并尝试重新获取，
+    省去读取前的单独存在性检查；其他读取错误只跳过该条语录，不删除记录。
+    随机模式下一次取回一批候选语录，逐个尝试读取，无效记录最后一次性批量删除。
+    同时进行的查询数量受 _QUERY_CONCURRENCY 限制。
     """
+    async with _query_semaphore:
+        return await _find_valid_quote(group_id, user_id_filter, keywords, max_retries)
+
+
+async def _find_valid_quote(
+    group_id: str,
+    user_id_filter: str | None,
+    keywords: list[str] | None,
+    max_retries: int,
+) -> tuple[Quote, bytes] | None:
+    """_get_valid_quote 的具体实现，由调用方持有查询信号量"""
     for _ in range(max_retries):
-        quote: Quote | None = None
-        if keyword:
-            quote = await QuoteService.search_quote(group_id, keyword, user_id_filter)
+        if keywords:
+            quote = await QuoteService.search_quote(group_id, keywords, user_id_filter)
+            candidates = [quote] if quote else []
         else:
-            quote = await QuoteService.get_random_quote(group_id, user_id_filter)
+            candidates = await QuoteService.get_random_quotes(group_id, user_id_filter)
 
-        if not quote:
+        if not candidates:
             return None
 
-        if safe_file_exists(quote.image_path):
-            return quote
-
-        logger.warning(
-            f"数据库中的语录 (ID: {quote.id}) 对应的图片文件不存在: {quote.image_path}",
-            "群聊语录",
-        )
-        await quote.delete()
-        logger.info(f"已删除无效的语录记录 ID: {quote.id}", "群聊语录")
+        result: tuple[Quote, bytes] | None = None
+        invalid_ids: list[int] = []
+        for quote in candidates:
+            try:
+                image_bytes = await _read_quote_image(quote)
+            except OSError:
+                continue
+            if image_bytes is not None:
+                result = (quote, image_bytes)
+                break
+            invalid_ids.append(quote.id)
+
+        if invalid_ids:
+            await QuoteService.bulk_delete_by_ids(invalid_ids)
+            logger.info(f"已删除无效的语录记录 ID: {invalid_ids}", "群聊语录")
+
+        if result:
+            if not keywords:
+                QuoteService.mark_quote_shown(group_id, user_id_filter, result[0].id)
+            return result
 
     logger.error(
         f"在尝试 {max_retries} 次后仍未找到有效的语录文件，放弃操作。", "群聊语录"
@@ -68,182 +128,207 @@ async def _get_valid_quote(
     return None
 
 
+def _build_fallback_message(user_id_filter: str | None, keyword: str) -> UniMessage:
+    """构造关键词无结果、改为发送随机语录时的提示消息"""
+    if user_id_filter:
+        return MessageUtils.build_message(
+            [
+                At(target=user_id_filter, flag="user"),
+                f" 关于 '{keyword}' 的语录没找到哦，这是TA的一条随机语录：\n",
+            ]
+        )
+    return MessageUtils.build_message(["当前查询无结果, 为您随机发送。"])
+
+
 @record_pool.handle()
 async def record_pool_handle(bot: Bot, event: Event, arp: Arparma, state: T_State):
     """语录查询处理函数 (重构后)"""
-    session_id = event.get_session_id()
-    if "group" not in session_id:
+    group_id = get_group_id_from_session(event.get_session_id())
+    if not group_id:
         return
 
-    group_id = session_id.split("_")[1]
-    target = PlatformUtils.get_target(group_id=group_id)
+    target = get_cached_target(group_id=group_id)
 
     at_user_info: At | None = arp.all_matched_args.get("target_user")
     search_keywords: list[str] = arp.all_matched_args.get("search_keywords", [])
-    search_key_processed = " ".join(search_keywords) if search_keywords else ""
     user_id_filter: str | None = str(at_user_info.target) if at_user_info else None
 
-    quote: Quote | None = None
     fallback_message: UniMessage | None = None
 
-    if user_id_filter:
-        quote = await _get_valid_quote(
-            group_id, user_id_filter=user_id_filter, keyword=search_key_processed
-        )
-        if not quote and search_key_processed:
-            fallback_quote = await _get_valid_quote(
-                group_id, user_id_filter=user_id_filter
+    result = await _get_valid_quote(
+        group_id, user_id_filter=user_id_filter, keywords=search_keywords
+    )
+    if not result and search_keywords:
+        result = await _get_valid_quote(group_id, user_id_filter=user_id_filter)
+        if result:
+            fallback_message = _build_fallback_message(
+                user_id_filter, " ".join(search_keywords)
             )
-            if fallback_quote:
-                quote = fallback_quote
-                fallback_message = MessageUtils.build_message(
-                    [
-                        At(target=user_id_filter, flag="user"),
-                        f" 关于 '{search_key_processed}' 的语录没找到哦，这是TA的一条随机语录：\n",
-                    ]
-                )
-            else:
-                await MessageUtils.build_message(
-                    [At(target=user_id_filter, flag="user"), " 没有任何语录哦~"]
-                ).send(target=target, bot=bot)
-                return
-    else:
-        quote = await _get_valid_quote(group_id, keyword=search_key_processed)
-        if not quote and search_key_processed:
-            fallback_quote = await _get_valid_quote(group_id)
-            if fallback_quote:
-                quote = fallback_quote
-                fallback_message = MessageUtils.build_message(
-                    ["当前查询无结果, 为您随机发送。"]
-                )
-            else:
-                await MessageUtils.build_message("当前无语录库").send(
-                    target=target, bot=bot
-                )
-                return
+        elif user_id_filter:
+            await MessageUtils.build_message(
+                [At(target=user_id_filter, flag="user"), " 没有任何语录哦~"]
+            ).send(target=target, bot=bot)
+            return
 
-    if not quote:
+    if not result:
         await MessageUtils.build_message("当前无语录库").send(target=target, bot=bot)
         return
 
-    absolute_path = resolve_quote_image_path(quote.image_path)
-
-    async with aiofiles.open(absolute_path, "rb") as f:
-        image_bytes = await f.read()
+    quote, image_bytes = result
     message_to_send = MessageUtils.build_message(image_bytes)
 
     if fallback_message:
         await fallback_message.send(target=target, bot=bot)
 
-    await QuoteService.increment_view_count(quote.id)
+    ViewCountService.submit(quote.id)
     await message_to_send.send(target=target, bot=bot)
 
 
-@quote_stats_cmd.handle()
-async def handle_quote_stats(bot: Bot, event: Event, arp: Arparma):
-    """语录统计处理函数"""
-    session_id = event.get_session_id()
-    current_user_id = str(event.get_user_id())
+# 排行榜类统计：子命令 -> (查询方法, 统计名称, 图表标签, 无数据提示)
+_RANKING_STATS: dict[
+    str, tuple[Callable[[str, int], Awaitable[list[dict]]], str, str, str]
+] = {
+    "top-uploaders": (
+        QuoteService.get_most_prolific_uploaders,
+        "高产上传",
+        "语录上传",
+        "高产上传",
+    ),
+    "top-quoted": (
+        QuoteService.get_most_quoted_users,
+        "高产被录",
+        "被记录语录",
+        "高产被记录",
+    ),
+}
 
-    group_id_to_query: str | None = None
+# 渲染好的统计图片短时缓存：(群号, 统计类型, 数量) -> 图片数据
+_stats_image_cache: TTLCache[tuple[str, str, int], bytes] = TTLCache(512, ttl=60)
+# 正在生成中的统计任务，相同请求并发到达时共享同一次查询与渲染
+_stats_inflight: dict[tuple[str, str, int], asyncio.Task[str | bytes | None]] = {}
 
-    if "group" in session_id:
-        group_id_to_query = session_id.split("_")[1]
 
-    if not group_id_to_query:
-        await quote_stats_cmd.finish("请在群聊中执行此命令。")
-        return
+async def _build_hot_stats(
+    group_id: str, limit: int, bot_id: str
+) -> str | bytes | None:
+    """生成热门语录统计，返回图片数据或提示文本"""
+    logger.debug(f"执行 '热门' 统计，limit={limit}", "群聊语录")
 
-    reply_target = PlatformUtils.get_target(
-        group_id=session_id.split("_")[1] if "group" in session_id else None,
-        user_id=current_user_id if "private" in session_id else None,
-    )
-    if not reply_target:
-        reply_target = PlatformUtils.get_target(user_id=current_user_id)
+    start_time = time.perf_counter()
 
-    result_message: str | bytes | None = None
+    hottest_quotes = await QuoteService.get_hottest_quotes(group_id, limit)
 
-    path_to_check = ""
-    if arp.find("stats.hot"):
-        path_to_check = "hot"
-    elif arp.find("stats.top-uploaders"):
-        path_to_check = "top-uploaders"
-    elif arp.find("stats.top-quoted"):
-        path_to_check = "top-quoted"
+    fetch_time = time.perf_counter() - start_time
+    logger.debug(
+        f"获取热门语录耗时: {fetch_time:.3f}秒，数量: {len(hottest_quotes)}",
+        "群聊语录",
+    )
 
-    if path_to_check == "hot":
-        limit = arp.query("stats.hot.limit", 10)
-        logger.debug(f"执行 '热门' 统计，limit={limit}", "群聊语录")
+    if not hottest_quotes:
+        logger.warning(f"群组 {group_id} 没有热门语录数据", "群聊语录")
+        return f"群组 {group_id} 暂时没有热门语录。"
 
-        import time
+    gen_start_time = time.perf_counter()
 
-        start_time = time.time()
+    result_message = await QuoteService.generate_hottest_quotes_image(
+        group_id, hottest_quotes, bot_id
+    )
 
-        hottest_quotes = await QuoteService.get_hottest_quotes(group_id_to_query, limit)
+    gen_time = time.perf_counter() - gen_start_time
+    logger.debug(f"生成热门语录图片耗时: {gen_time:.3f}秒", "群聊语录")
+
+    total_time = time.perf_counter() - start_time
+    logger.debug(f"热门语录统计总耗时: {total_time:.3f}秒", "群聊语录")
+    return result_message
+
+
+async def _build_ranking_stats(
+    stat_type: str, group_id: str, limit: int, bot_id: str
+) -> str | bytes | None:
+    """生成排行榜类统计图表，返回图片数据或提示文本"""
+    fetcher, stat_name, chart_label, empty_label = _RANKING_STATS[stat_type]
+    logger.info(f"执行 '{stat_name}' 统计，limit={limit}", "群聊语录")
+    prolific_users = await fetcher(group_id, limit)
+    if not prolific_users:
+        return f"群组 {group_id} 暂时没有{empty_label}用户数据。"
+    return await QuoteService.generate_bar_chart_for_prolific_users(
+        group_id, prolific_users, chart_label
+    )
 
-        fetch_time = time.time() - start_time
-        logger.debug(f"获取热门语录耗时: {fetch_time:.3f}秒", "群聊语录")
 
-        if hottest_quotes:
-            image_quotes_count = sum(
-                1
-                for q in hottest_quotes
-                if q.image_path and not (q.ocr_text or q.recorded_text)
-            )
-            text_quotes_count = len(hottest_quotes) - image_quotes_count
-            logger.debug(
-                f"热门语录类型统计 - 总数: {len(hottest_quotes)}, "
-                f"图片语录: {image_quotes_count}, 文本语录: {text_quotes_count}",
-                "群聊语录",
-            )
+# 统计子命令 -> 结果生成函数 (群号, 数量, Bot ID)
+_STATS_BUILDERS: dict[str, Callable[[str, int, str], Awaitable[str | bytes | None]]] = {
+    "hot": _build_hot_stats,
+    **{
+        stat_type: functools.partial(_build_ranking_stats, stat_type)
+        for stat_type in _RANKING_STATS
+    },
+}
+
+
+async def _run_stats_builder(
+    stat_type: str, group_id: str, limit: int, bot_id: str
+) -> str | bytes | None:
+    """限制同时生成的统计图数量，避免渲染占满资源拖慢其他事件处理"""
+    async with _stats_semaphore:
+        return await _STATS_BUILDERS[stat_type](group_id, limit, bot_id)
+
+
+async def _get_stats_result_single_flight(
+    key: tuple[str, str, int], bot_id: str
+) -> str | bytes | None:
+    """同一统计请求在生成期间只执行一次，其余请求等待同一任务的结果"""
+    task = _stats_inflight.get(key)
+    if task is None:
+        group_id, stat_type, limit = key
+        task = asyncio.create_task(
+            _run_stats_builder(stat_type, group_id, limit, bot_id)
+        )
+        _stats_inflight[key] = task
+        task.add_done_callback(lambda _: _stats_inflight.pop(key, None))
+    else:
+        logger.debug(f"等待进行中的语录统计任务: {key}", "群聊语录")
+    # 单个请求被取消时不影响其他等待者
+    return await asyncio.shield(task)
 
-            gen_start_time = time.time()
 
-            result_message = await QuoteService.generate_hottest_quotes_image(
-                group_id_to_query, hottest_quotes, bot.self_id
-            )
+@quote_stats_cmd.handle()
+async def handle_quote_stats(bot: Bot, event: Event, arp: Arparma):
+    """语录统计处理函数"""
+    current_user_id = str(event.get_user_id())
+    group_id_to_query = get_group_id_from_session(event.get_session_id())
 
-            gen_time = time.time() - gen_start_time
-            logger.debug(f"生成热门语录图片耗时: {gen_time:.3f}秒", "群聊语录")
+    if not group_id_to_query:
+        await quote_stats_cmd.finish("请在群聊中执行此命令。")
+        return
 
-            total_time = time.time() - start_time
-            logger.debug(f"热门语录统计总耗时: {total_time:.3f}秒", "群聊语录")
-        else:
-            logger.warning(f"群组 {group_id_to_query} 没有热门语录数据", "群聊语录")
-            result_message = f"群组 {group_id_to_query} 暂时没有热门语录。"
-
-    elif path_to_check == "top-uploaders":
-        limit = arp.query("stats.top-uploaders.limit", 10)
-        logger.info(f"执行 '高产上传' 统计，limit={limit}", "群聊语录")
-        prolific_uploaders = await QuoteService.get_most_prolific_uploaders(
-            group_id_to_query, limit
-        )
-        if prolific_uploaders:
-            result_message = await QuoteService.generate_bar_chart_for_prolific_users(
-                group_id_to_query, prolific_uploaders, "语录上传"
-            )
-        else:
-            result_message = f"群组 {group_id_to_query} 暂时没有高产上传用户数据。"
+    reply_target = get_cached_target(group_id=group_id_to_query) or get_cached_target(
+        user_id=current_user_id
+    )
 
-    elif path_to_check == "top-quoted":
-        limit = arp.query("stats.top-quoted.limit", 10)
-        logger.info(f"执行 '高产被录' 统计，limit={limit}", "群聊语录")
-        prolific_quoted = await QuoteService.get_most_quoted_users(
-            group_id_to_query, limit
-        )
-        if prolific_quoted:
-            result_message = await QuoteService.generate_bar_chart_for_prolific_users(
-                group_id_to_query, prolific_quoted, "被记录语录"
-            )
-        else:
-            result_message = f"群组 {group_id_to_query} 暂时没有高产被记录用户数据。"
+    # 直接读取 Alconna 已解析出的子命令，不再逐个路径查找
+    stats_result = arp.subcommands.get("stats")
+    path_to_check = (
+        next(iter(stats_result.subcommands), "") if stats_result is not None else ""
+    )
 
-    else:
+    if path_to_check not in _STATS_BUILDERS:
         await MessageUtils.build_message(
             "请指定统计类型：热门、高产上传、高产被录。\n例如：语录统计 热门"
         ).send(target=reply_target, bot=bot)
         return
 
+    limit = arp.query(f"stats.{path_to_check}.limit", 10)
+    cache_key = (group_id_to_query, path_to_check, limit)
+    result_message = _stats_image_cache.get(cache_key)
+    if result_message is not None:
+        logger.debug(f"命中语录统计缓存: {cache_key}", "群聊语录")
+    else:
+        result_message = await _get_stats_result_single_flight(cache_key, bot.self_id)
+        # 只缓存渲染出的图片，提示文本与失败信息不缓存
+        if result_message and not isinstance(result_message, str):
+            _stats_image_cache[cache_key] = result_message
+
     try:
         if result_message:
             if isinstance(result_message, str):
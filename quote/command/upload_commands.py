@@ -3,7 +3,6 @@ import hashlib
 import os
 import html
 import re
-import uuid
 from typing import Any, cast
 
 import aiofiles
@@ -24,19 +23,25 @@ from nonebot_plugin_alconna.uniseg import (
 from nonebot_plugin_alconna.uniseg.tools import reply_fetch
 from nonebot_plugin_uninfo import Uninfo
 
-from zhenxun import ui
 from zhenxun.configs.config import Config
 from zhenxun.services.log import logger
 from zhenxun.utils.message import MessageUtils
 from zhenxun.utils.http_utils import AsyncHttpx
 
 from ..config import ensure_quote_path
-from ..command.manage_commands import get_available_themes
+from ..command.manage_commands import get_available_themes, parse_theme_index
 from ..model import Quote, QuoteCardData, QuoteSequenceData, QuotedReplyData
 from ..services.ocr_service import OCRService
 from ..services.quote_service import QuoteService
+from ..services.render_cache_service import RenderCacheService
 from ..utils.exceptions import ImageProcessError, NetworkError
-from ..utils.image_utils import get_img_hash
+from ..utils.image_utils import (
+    get_image_data_url,
+    get_img_hash_from_bytes,
+    link_or_copy_file,
+    safe_unlink,
+)
+from ..utils.session_utils import get_group_id_from_session
 
 from zhenxun.services import avatar_service
 
@@ -183,11 +188,8 @@ async def _process_nested_reply(
                     platform="qq", identifier=gp_user_id
                 )
                 if gp_avatar_path:
-                    async with aiofiles.open(gp_avatar_path, "rb") as f:
-                        gp_avatar_bytes = await f.read()
-                    gp_avatar_base64 = base64.b64encode(gp_avatar_bytes).decode("utf-8")
                     return QuotedReplyData(
-                        avatar_data_url=f"data:image/png;base64,{gp_avatar_base64}",
+                        avatar_data_url=await get_image_data_url(gp_avatar_path),
                         author=gp_author,
                         text=gp_content_list,
                     )
@@ -277,9 +279,7 @@ async def _convert_msg_to_card(
     if not avatar_path:
         raise NetworkError(f"获取用户 {user_id} 的头像失败")
 
-    async with aiofiles.open(avatar_path, "rb") as f:
-        avatar_bytes = await f.read()
-    avatar_base64 = base64.b64encode(avatar_bytes).decode("utf-8")
+    avatar_data_url = await get_image_data_url(avatar_path)
 
     # 3. 处理消息内容
     content_list = []
@@ -336,7 +336,7 @@ async def _convert_msg_to_card(
     await flush_text()
 
     card_data = QuoteCardData(
-        avatar_data_url=f"data:image/png;base64,{avatar_base64}",
+        avatar_data_url=avatar_data_url,
         text=content_list,
         author=card,
         author_role=role,
@@ -371,7 +371,7 @@ async def _generate_quote_from_reply(
         )
 
         # 直接渲染卡片
-        img_data = await ui.render(card_data)
+        img_data = await RenderCacheService.render(card_data)
 
         return (img_data, card_data.author, qqid, quoted_reply_data), None
     except (NetworkError, ImageProcessError, FileNotFoundError) as e:
@@ -435,7 +435,7 @@ async def _generate_sequence_from_history(
         card_data_list.append(card_data)
 
     sequence_data = QuoteSequenceData(messages=card_data_list)
-    img_data = await ui.render(sequence_data)
+    img_data = await RenderCacheService.render(sequence_data)
     return img_data, "\n".join(recorded_text_parts), last_quoted_user_id
 
 
@@ -464,6 +464,13 @@ generate_quote_cmd = on_alconna(generate_quote_alc, block=True)
 async def save_img_handle(bot: Bot, event: MessageEvent, arp: Arparma, state: T_State):
     """上传语录处理函数"""
     session_id = event.get_session_id()
+    group_id = get_group_id_from_session(session_id)
+    if not group_id:
+        logger.info(
+            f"上传指令在非群聊环境 ({session_id}) 中被调用，未处理。", "群聊语录"
+        )
+        await save_img_cmd.finish("上传功能目前仅支持群聊。")
+
     message_id = event.message_id
     user_id = str(event.get_user_id())
 
@@ -492,11 +499,14 @@ async def save_img_handle(bot: Bot, event: MessageEvent, arp: Arparma, state: T_
 
     # 3. 统一提取图片二进制数据
     img_data = b""
+    # 图片来自本地文件时记录其路径，保存时直接链接/复制该文件
+    source_path: str | None = None
     try:
         if target_image.raw:
             img_data = target_image.raw
         elif target_image.path and os.path.exists(target_image.path):
-            async with aiofiles.open(target_image.path, "rb") as f:
+            source_path = str(target_image.path)
+            async with aiofiles.open(source_path, "rb") as f:
                 img_data = await f.read()
         elif target_image.url:
             img_data = await AsyncHttpx.get_content(target_image.url)
@@ -507,6 +517,8 @@ async def save_img_handle(bot: Bot, event: MessageEvent, arp: Arparma, state: T_
                 if os.path.exists(file_path):
                     async with aiofiles.open(file_path, "rb") as f:
                         img_data = await f.read()
+                    if img_data:
+                        source_path = file_path
             if not img_data and (url := resp.get("url")):
                 img_data = await AsyncHttpx.get_content(url)
     except Exception as e:
@@ -515,99 +527,73 @@ async def save_img_handle(bot: Bot, event: MessageEvent, arp: Arparma, state: T_
     if not img_data:
         await save_img_cmd.finish("未能成功获取图片数据，请检查图片是否有效。")
 
-    # 4. 创建临时文件以供后续 OCR 和哈希计算使用
-    quote_path = ensure_quote_path()
-    temp_image_path = quote_path / f"temp_{uuid.uuid4().hex}.png"
+    # 4. 直接基于内存中的数据计算哈希，重复图片无需落盘
+    image_hash = await get_img_hash_from_bytes(img_data)
+
+    if (
+        image_hash
+        and await Quote.filter(group_id=group_id, image_hash=image_hash).exists()
+    ):
+        await bot.call_api(
+            "send_group_msg",
+            **{
+                "group_id": int(group_id),
+                "message": MessageSegment.reply(message_id) + "不要重复记录",
+            },
+        )
+        return
+
+    # 5. 只写入一次最终文件，OCR 直接读取该文件
+    image_name = hashlib.md5(img_data).hexdigest() + ".png"
+    final_image_path = ensure_quote_path() / image_name
     try:
-        async with aiofiles.open(temp_image_path, "wb") as f:
-            await f.write(img_data)
+        if source_path:
+            await link_or_copy_file(source_path, final_image_path)
+        else:
+            async with aiofiles.open(final_image_path, "wb") as f:
+                await f.write(img_data)
     except Exception as e:
-        await save_img_cmd.finish(f"写入临时文件失败: {e}")
+        await save_img_cmd.finish(f"写入图片文件失败: {e}")
 
-    if "group" in session_id:
-        group_id = session_id.split("_")[1]
-        image_hash = await get_img_hash(temp_image_path)
+    ocr_content = await OCRService.recognize_text(str(final_image_path))
 
-        if (
-            image_hash
-            and await Quote.filter(group_id=group_id, image_hash=image_hash).exists()
-        ):
-            if temp_image_path.name.startswith("temp_") and temp_image_path.exists():
-                try:
-                    os.remove(temp_image_path)
-                    logger.info(
-                        f"删除临时文件 (发现重复): {temp_image_path}", "群聊语录"
-                    )
-                except Exception as e:
-                    logger.error(f"删除临时文件失败: {e}", "群聊语录", e=e)
+    quote, is_new = await QuoteService.add_quote(
+        group_id=group_id,
+        image_path=str(final_image_path),
+        ocr_content=ocr_content,
+        recorded_text=None,
+        uploader_user_id=user_id,
+        image_hash=image_hash,
+    )
+
+    if quote:
+        if is_new:
             await bot.call_api(
                 "send_group_msg",
                 **{
                     "group_id": int(group_id),
-                    "message": MessageSegment.reply(message_id) + "不要重复记录",
+                    "message": MessageSegment.reply(message_id) + "保存成功",
                 },
             )
-            return
-
-        ocr_content = await OCRService.recognize_text(str(temp_image_path))
-
-        image_name = hashlib.md5(img_data).hexdigest() + ".png"
-        quote_path = ensure_quote_path()
-        final_image_path = quote_path / image_name
-
-        async with aiofiles.open(final_image_path, "wb") as f:
-            await f.write(img_data)
-
-        if temp_image_path != final_image_path and os.path.exists(temp_image_path):
-            try:
-                os.remove(temp_image_path)
-                logger.info(f"删除临时文件: {temp_image_path}", "群聊语录")
-            except Exception as e:
-                logger.error(f"删除临时文件失败: {e}", "群聊语录", e=e)
-
-        quote, is_new = await QuoteService.add_quote(
-            group_id=group_id,
-            image_path=str(final_image_path),
-            ocr_content=ocr_content,
-            recorded_text=None,
-            uploader_user_id=user_id,
-            image_hash=image_hash,
-        )
-
-        if quote:
-            if is_new:
-                await bot.call_api(
-                    "send_group_msg",
-                    **{
-                        "group_id": int(group_id),
-                        "message": MessageSegment.reply(message_id) + "保存成功",
-                    },
-                )
-            else:
-                if os.path.exists(final_image_path):
-                    os.remove(final_image_path)
-                await bot.call_api(
-                    "send_group_msg",
-                    **{
-                        "group_id": int(group_id),
-                        "message": MessageSegment.reply(message_id) + "不要重复记录",
-                    },
-                )
         else:
+            await safe_unlink(final_image_path)
             await bot.call_api(
                 "send_group_msg",
                 **{
                     "group_id": int(group_id),
-                    "message": (
-                        MessageSegment.reply(message_id) + "保存失败，可能是数据库错误"
-                    ),
+                    "message": MessageSegment.reply(message_id) + "不要重复记录",
                 },
             )
     else:
-        logger.info(
-            f"上传指令在非群聊环境 ({session_id}) 中被调用，未处理。", "群聊语录"
+        await bot.call_api(
+            "send_group_msg",
+            **{
+                "group_id": int(group_id),
+                "message": (
+                    MessageSegment.reply(message_id) + "保存失败，可能是数据库错误"
+                ),
+            },
         )
-        await save_img_cmd.send("上传功能目前仅支持群聊。")
 
 
 async def _handle_quote_generation(
@@ -658,21 +644,20 @@ async def _handle_quote_generation(
         quoted_reply_data = await _process_nested_reply(message_array, bot)
         has_nested_reply = quoted_reply_data is not None
 
-        if user_variant and user_variant.isdigit():
-            try:
-                theme_index = int(user_variant)
-                available_themes = get_available_themes()
-                if 1 <= theme_index <= len(available_themes):
-                    user_variant = available_themes[theme_index - 1]
-                else:
-                    return (
-                        None,
-                        None,
-                        None,
-                        f"无效的主题序号 '{theme_index}'。请从 1 到 {len(available_themes)} 中选择。",
-                    )
-            except (ValueError, IndexError):
-                pass
+        if (
+            user_variant
+            and (theme_index := parse_theme_index(user_variant)) is not None
+        ):
+            available_themes = get_available_themes()
+            if 1 <= theme_index <= len(available_themes):
+                user_variant = available_themes[theme_index - 1]
+            else:
+                return (
+                    None,
+                    None,
+                    None,
+                    f"无效的主题序号 '{theme_index}'。请从 1 到 {len(available_themes)} 中选择。",
+                )
 
         if user_variant:
             final_variant = user_variant
@@ -874,14 +859,12 @@ async def make_record_handle(
         if quote and is_new:
             await MessageUtils.build_message(img_data).send(target=event, bot=bot)
         else:
-            if os.path.exists(image_path):
-                os.remove(image_path)
+            await safe_unlink(image_path)
             msg = "不要重复记录" if not is_new else "保存语录时发生意外，请稍后再试"
             await MessageUtils.build_message(msg).send(target=event, bot=bot)
     except Exception as e:
         logger.error(f"记录语录过程中发生IO或数据库错误: {e}", "群聊语录", e=e)
-        if os.path.exists(image_path):
-            os.remove(image_path)
+        await safe_unlink(image_path)
         await MessageUtils.build_message("保存语录时发生意外，请稍后再试").send(
             target=event, bot=bot
         )
@@ -1,3 +1,5 @@
+import functools
+import os
 from pathlib import Path
 
 from zhenxun.configs.config import Config
@@ -5,6 +7,7 @@ from zhenxun.configs.path_config import DATA_PATH
 from zhenxun.services.log import logger
 
 QUOTE_ASSETS_PATH = Path(__file__).parent / "templates"
+QUOTE_COMPONENTS_PATH = QUOTE_ASSETS_PATH / "components"
 
 
 def get_quote_path() -> Path:
@@ -21,11 +24,26 @@ def get_quote_path() -> Path:
         return default_path
 
 
+@functools.cache
+def _ensure_dir_once(path: Path) -> Path:
+    """
+    在进程生命周期内对同一目录只执行一次创建，返回其绝对路径。
+    使用 absolute() 而非 resolve()，不解析符号链接，
+    保存到数据库的相对路径不会因数据目录是符号链接而变成 ../ 形式。
+    """
+    path = path.absolute()
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
 def ensure_quote_path() -> Path:
     """确保语录图片目录存在并返回路径"""
-    quote_path = get_quote_path()
-    quote_path.mkdir(parents=True, exist_ok=True)
-    return quote_path
+    return _ensure_dir_once(get_quote_path())
+
+
+def get_render_cache_path() -> Path:
+    """获取渲染结果缓存目录，位于语录图片目录下的 cache 子目录"""
+    return _ensure_dir_once(ensure_quote_path() / "cache")
 
 
 def get_quote_image_path(filename: str) -> Path:
@@ -41,23 +59,23 @@ def normalize_path(path: str | Path) -> Path:
     return path
 
 
+@functools.lru_cache(maxsize=4096)
 def resolve_quote_image_path(path_str: str | Path) -> Path:
     """
     解析语录图片路径，无论是相对还是绝对，都返回一个可用的绝对路径。
     这是处理新旧两种路径格式的核心。
+    结果只取决于入参与固定的数据目录，因此按入参缓存。
     """
     clean_path = str(path_str).replace("\\", "/").lstrip("/").lstrip("\\")
     return DATA_PATH / clean_path
 
 
-def safe_file_exists(file_path: str | Path) -> bool:
-    """安全地检查文件是否存在，处理新旧两种路径格式。"""
-    try:
-        absolute_path = resolve_quote_image_path(file_path)
-        return absolute_path.exists() and absolute_path.is_file()
-    except (OSError, PermissionError) as e:
-        logger.warning(f"检查文件存在性时出错: {file_path}, 错误: {e}", "群聊语录")
-        return False
+def to_stored_image_path(path: str | Path) -> str:
+    """将图片路径转换为数据库中保存的格式：相对于数据目录、以正斜杠分隔"""
+    path_str = str(path)
+    if os.path.isabs(path_str):
+        path_str = os.path.relpath(path_str, DATA_PATH)
+    return path_str.replace("\\", "/")
 
 
 def ensure_directory_exists(dir_path: str | Path) -> Path:
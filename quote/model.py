@@ -1,22 +1,22 @@
 from collections.abc import Iterable
-from pathlib import Path
 from typing import Any
 from tortoise import fields
+from tortoise.signals import pre_save
 from pydantic import BaseModel, Field
 from zhenxun.services.db_context import Model
 from zhenxun.ui.models import RenderableComponent
 from zhenxun.ui.models.core.base import ContainerComponent
 
-QUOTE_ASSETS_PATH = Path(__file__).parent / "templates"
+from .config import QUOTE_COMPONENTS_PATH, to_stored_image_path
+
 
 _base_theme_cache: dict[str, str] = {}
 
 
 def _find_base_theme_for_variant(variant_name: str) -> str:
     if not _base_theme_cache:
-        components_root = QUOTE_ASSETS_PATH / "components"
-        if components_root.exists() and components_root.is_dir():
-            for component_dir in components_root.iterdir():
+        if QUOTE_COMPONENTS_PATH.is_dir():
+            for component_dir in QUOTE_COMPONENTS_PATH.iterdir():
                 if component_dir.is_dir():
                     base_theme_name = component_dir.name
                     _base_theme_cache[base_theme_name] = base_theme_name
@@ -67,6 +67,20 @@ class Quote(Model):
     class Meta:
         table = "quote"
         table_description = "语录表"
+        indexes = (
+            ("group_id", "uploader_user_id"),
+            ("group_id", "quoted_user_id"),
+            ("group_id", "view_count"),
+        )
+
+
+@pre_save(Quote)
+async def _normalize_image_path(sender, instance: Quote, using_db, update_fields):
+    """写入时统一图片路径格式，读取语录时无需再逐条处理"""
+    if update_fields and "image_path" not in update_fields:
+        return
+    if instance.image_path:
+        instance.image_path = to_stored_image_path(instance.image_path)
 
 
 class QuotedReplyData(BaseModel):
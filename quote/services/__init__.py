@@ -1,5 +1,13 @@
 from .image_service import ImageService
 from .ocr_service import OCRService
 from .quote_service import QuoteService
+from .render_cache_service import RenderCacheService
+from .view_count_service import ViewCountService
 
-__all__ = ["ImageService", "OCRService", "QuoteService"]
+__all__ = [
+    "ImageService",
+    "OCRService",
+    "QuoteService",
+    "RenderCacheService",
+    "ViewCountService",
+]
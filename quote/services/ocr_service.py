@@ -1,6 +1,7 @@
 import asyncio
 from abc import ABC, abstractmethod
 from concurrent.futures import ThreadPoolExecutor
+import threading
 from typing import Any, ClassVar
 
 from cachetools import TTLCache
@@ -16,6 +17,7 @@ class OCREngine(ABC):
     def __init__(self, use_gpu: bool):
         self.use_gpu = use_gpu
         self._model = None
+        self._load_lock = threading.Lock()
 
     @abstractmethod
     def load_model(self) -> Any:
@@ -28,9 +30,11 @@ class OCREngine(ABC):
         pass
 
     def ensure_model(self):
-        """确保模型已加载"""
+        """确保模型已加载，多个线程同时调用时只会加载一次"""
         if self._model is None:
-            self._model = self.load_model()
+            with self._load_lock:
+                if self._model is None:
+                    self._model = self.load_model()
         return self._model
 
 
@@ -65,8 +69,16 @@ class PaddleOCREngine(OCREngine):
         try:
             from paddleocr import PaddleOCR
 
+            # CPU 模式下推理是串行的，批大小大于1只会额外占用内存
+            batch_kwargs = (
+                {} if self.use_gpu else {"rec_batch_num": 1, "cls_batch_num": 1}
+            )
             return PaddleOCR(
-                use_angle_cls=True, lang="ch", use_gpu=self.use_gpu, show_log=False
+                use_angle_cls=True,
+                lang="ch",
+                use_gpu=self.use_gpu,
+                show_log=False,
+                **batch_kwargs,
             )
         except Exception as e:
             logger.error(f"加载PaddleOCR失败: {e}", "群聊语录", e=e)
@@ -95,11 +107,14 @@ class OCRService:
     _engine_name: str | None = None
     _use_gpu: bool = False
 
-    _thread_executor = ThreadPoolExecutor(max_workers=2)
+    _max_concurrency: ClassVar[int] = 2
+    _thread_executor = ThreadPoolExecutor(max_workers=_max_concurrency)
+    _ocr_semaphore: ClassVar[asyncio.Semaphore] = asyncio.Semaphore(_max_concurrency)
 
     _cache: ClassVar[TTLCache] = TTLCache(maxsize=1000, ttl=3600)
 
     _initialized = False
+    _init_lock: ClassVar[asyncio.Lock] = asyncio.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -108,56 +123,80 @@ class OCRService:
 
     @classmethod
     async def initialize_engine(cls) -> None:
-        """初始化OCR引擎"""
+        """初始化OCR引擎，首次使用时调用，并发调用时只会初始化一次"""
         if cls._initialized:
             return
 
-        try:
-            quote_config = Config.get("quote")
-            if quote_config:
-                cls._engine_name = quote_config.get("OCR_ENGINE", "easyocr")
-                cls._use_gpu = quote_config.get("OCR_USE_GPU", False)
-            else:
-                cls._engine_name = "easyocr"
-                cls._use_gpu = False
+        async with cls._init_lock:
+            if cls._initialized:
+                return
+
+            try:
+                quote_config = Config.get("quote")
+                if quote_config:
+                    cls._engine_name = quote_config.get("OCR_ENGINE", "easyocr")
+                    cls._use_gpu = quote_config.get("OCR_USE_GPU", False)
+                else:
+                    cls._engine_name = "easyocr"
+                    cls._use_gpu = False
+
+                if cls._engine_name not in ["easyocr", "paddleocr"]:
+                    logger.warning(
+                        f"无效的OCR引擎: {cls._engine_name}，使用默认引擎 easyocr",
+                        "群聊语录",
+                    )
+                    cls._engine_name = "easyocr"
 
-            if cls._engine_name not in ["easyocr", "paddleocr"]:
-                logger.warning(
-                    f"无效的OCR引擎: {cls._engine_name}，使用默认引擎 easyocr",
+                logger.info(
+                    f"OCR服务初始化 - 引擎: {cls._engine_name}, GPU: {cls._use_gpu}",
                     "群聊语录",
                 )
-                cls._engine_name = "easyocr"
 
-            logger.info(
-                f"OCR服务初始化 - 引擎: {cls._engine_name}, GPU: {cls._use_gpu}",
-                "群聊语录",
-            )
+                if cls._engine_name == "paddleocr":
+                    cls._strategy = PaddleOCREngine(cls._use_gpu)
+                else:
+                    cls._strategy = EasyOCREngine(cls._use_gpu)
 
-            if cls._engine_name == "paddleocr":
-                cls._strategy = PaddleOCREngine(cls._use_gpu)
-            else:
-                cls._strategy = EasyOCREngine(cls._use_gpu)
+                cls._initialized = True
+            except Exception as e:
+                logger.error(f"OCR服务初始化失败: {e}", "群聊语录", e=e)
+                cls._initialized = False
+                raise e
 
-            cls._initialized = True
-        except Exception as e:
-            logger.error(f"OCR服务初始化失败: {e}", "群聊语录", e=e)
-            cls._initialized = False
-            raise e
+    @classmethod
+    async def warmup(cls) -> None:
+        """
+        后台预热OCR服务。
+        未启用AI识别时本地OCR是主要识别途径，此时提前在线程池中加载模型，
+        避免首次上传时等待模型加载。
+        """
+        strategy = await cls.get_engine()
+        if strategy is None or Config.get_config("quote", "AI_ENABLED", False):
+            return
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(cls._thread_executor, strategy.ensure_model)
+        logger.info(f"OCR模型预热完成 - 引擎: {cls._engine_name}", "群聊语录")
+
+    @classmethod
+    async def get_engine(cls) -> OCREngine | None:
+        """获取当前OCR引擎，未初始化时在此处延迟初始化"""
+        if not cls._initialized:
+            await cls.initialize_engine()
+        return cls._strategy
 
     @classmethod
     async def _execute_strategy(cls, strategy: OCREngine, image_path: str) -> str:
         """在线程池中执行OCR策略"""
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
-            cls._thread_executor, strategy.recognize, image_path
-        )
+        async with cls._ocr_semaphore:
+            return await loop.run_in_executor(
+                cls._thread_executor, strategy.recognize, image_path
+            )
 
     @classmethod
     async def recognize_text(cls, image_path: str) -> str:
         """识别图片中的文字"""
-        if not cls._initialized:
-            await cls.initialize_engine()
-
         if image_path in cls._cache:
             logger.debug(f"使用OCR缓存: {image_path}", "群聊语录")
             return cls._cache[image_path]
@@ -172,6 +211,7 @@ class OCRService:
             else:
                 logger.debug("AI识别失败或未启用，降级使用本地OCR引擎", "群聊语录")
 
+                await cls.get_engine()
                 if not cls._strategy:
                     cls._strategy = EasyOCREngine(cls._use_gpu)
 
@@ -1,13 +1,17 @@
+import asyncio
+from collections import defaultdict
+from collections.abc import Mapping
+import functools
 import os
-from pathlib import Path
 import random
 import base64
 from typing import Any, ClassVar
 
 from cachetools import TTLCache
 from nonebot.adapters.onebot.v11 import Bot
-from tortoise.expressions import Q
+from tortoise.expressions import F, Q
 from tortoise.functions import Count
+from tortoise.transactions import in_transaction
 
 from zhenxun import ui
 from zhenxun.models.group_member_info import GroupInfoUser
@@ -15,26 +19,30 @@ from zhenxun.services import avatar_service, logger
 from zhenxun.utils.echart_utils import ChartUtils
 from zhenxun.utils.echart_utils.models import Barh
 from zhenxun.utils.platform import PlatformUtils
-import aiofiles
 
-from ..config import DATA_PATH, resolve_quote_image_path
+from ..config import resolve_quote_image_path
 from ..model import HotQuoteItemData, HotQuotesPageData, Quote, QuoteCardData
+from ..utils.image_utils import get_image_data_url, safe_unlink
 
-try:
-    import spacy_pkuseg as pkuseg
 
-    seg = pkuseg.pkuseg(model_name="web")
-except ImportError:
-    logger.warning(
-        "未安装 'spacy_pkuseg'，分词功能将受限。请运行 `pip install zhenxun[pkuseg]`",
-        "群聊语录",
-    )
+class DummySeg:
+    def cut(self, text):
+        return [text] if text else []
 
-    class DummySeg:
-        def cut(self, text):
-            return [text] if text else []
 
-    seg = DummySeg()
+@functools.cache
+def _get_segmenter() -> Any:
+    """首次分词时才加载 pkuseg 模型，避免插件导入时加载"""
+    try:
+        import spacy_pkuseg as pkuseg
+
+        return pkuseg.pkuseg(model_name="web")
+    except ImportError:
+        logger.warning(
+            "未安装 'spacy_pkuseg'，分词功能将受限。请运行 `pip install zhenxun[pkuseg]`",
+            "群聊语录",
+        )
+        return DummySeg()
 
 
 class QuoteService:
@@ -75,12 +83,10 @@ class QuoteService:
             tags_source = ocr_content if ocr_content else recorded_text
             tags = QuoteService.cut_sentence(tags_source) if tags_source else []
 
-            relative_image_path = os.path.relpath(image_path, DATA_PATH)
-            relative_image_path = Path(relative_image_path).as_posix()
-
+            # 保存前由 Quote 的 pre_save 钩子转换为相对数据目录的路径
             quote = await Quote.create(
                 group_id=group_id,
-                image_path=relative_image_path,
+                image_path=image_path,
                 image_hash=image_hash,
                 ocr_text=ocr_content,
                 recorded_text=recorded_text,
@@ -107,20 +113,15 @@ class QuoteService:
             quote = await QuoteService.find_quote_by_basename(group_id, image_basename)
             if quote:
                 absolute_image_path = resolve_quote_image_path(quote.image_path)
-                if os.path.exists(absolute_image_path):
-                    try:
-                        os.remove(absolute_image_path)
-                        logger.info(
-                            f"图片文件删除成功: {absolute_image_path}", "群聊语录"
-                        )
-                    except Exception as file_error:
-                        logger.warning(
-                            f"删除图片文件失败: {absolute_image_path}, 错误: {file_error}",
-                            "群聊语录",
-                            e=file_error,
-                        )
-                else:
-                    logger.warning(f"图片文件不存在: {absolute_image_path}", "群聊语录")
+                try:
+                    await safe_unlink(absolute_image_path)
+                    logger.info(f"图片文件删除成功: {absolute_image_path}", "群聊语录")
+                except Exception as file_error:
+                    logger.warning(
+                        f"删除图片文件失败: {absolute_image_path}, 错误: {file_error}",
+                        "群聊语录",
+                        e=file_error,
+                    )
 
                 await Quote.filter(id=quote.id).delete()
                 logger.info(
@@ -138,10 +139,14 @@ class QuoteService:
             return False
 
     @classmethod
-    async def get_random_quote(
-        cls, group_id: str, user_id_filter: str | None = None
-    ) -> Quote | None:
-        """随机获取一条语录，可根据用户筛选，并避免短时间内重复展示"""
+    async def get_random_quotes(
+        cls, group_id: str, user_id_filter: str | None = None, n: int = 5
+    ) -> list[Quote]:
+        """
+        随机获取至多 n 条候选语录（随机顺序），优先选择近期未展示过的语录。
+        只查询ID后在内存中抽样，再按ID取回候选记录，无需加载整个群的语录。
+        返回的候选不会记入展示记录，调用方选定后需调用 mark_quote_shown。
+        """
         try:
             logger.info(
                 f"尝试随机获取语录 - 群组: {group_id}, 用户筛选: {user_id_filter}",
@@ -151,63 +156,66 @@ class QuoteService:
             if user_id_filter:
                 query_filters["quoted_user_id"] = user_id_filter
 
-            count = await Quote.filter(**query_filters).count()
-            if count == 0:
+            all_ids = await Quote.filter(**query_filters).values_list("id", flat=True)
+            if not all_ids:
                 logger.info(
                     f"群组 {group_id} 中 (用户: {user_id_filter or '任意'}) 没有语录",
                     "群聊语录",
                 )
-                return None
+                return []
 
             memory_key = f"{group_id}_{user_id_filter or 'all'}"
-
-            quotes = await Quote.filter(**query_filters)
-
-            if not quotes:
-                return None
-
-            recent_ids = cls._recent_quotes.get(memory_key) or []
-            if recent_ids and count > cls._max_history_per_key:
-                unseen_quotes = [q for q in quotes if q.id not in recent_ids]
-                if unseen_quotes:
-                    quotes = unseen_quotes
-                else:
-                    logger.warning(
-                        f"所有语录 ({memory_key}) 都已展示过，将重置记忆",
-                        "群聊语录",
-                    )
-                    cls._recent_quotes[memory_key] = []
-
-            quote = cls._select_and_record_quote(memory_key, quotes)
-
-            if quote:
-                logger.info(
-                    f"随机获取到语录 ID: {quote.id} (路径: {quote.image_path}) 来自群组 {group_id} (用户: {user_id_filter or '任意'})",
-                    "群聊语录",
-                )
-                return quote
-            else:
+            recent_ids = set(cls._recent_quotes.get(memory_key) or ())
+            candidate_ids = [i for i in all_ids if i not in recent_ids] or all_ids
+            if (
+                candidate_ids is all_ids
+                and recent_ids
+                and len(all_ids) > cls._max_history_per_key
+            ):
                 logger.warning(
-                    f"随机获取语录失败，即使 count > 0 (count={count}) - {memory_key}",
+                    f"所有语录 ({memory_key}) 都已展示过，将重置记忆",
                     "群聊语录",
                 )
-                return None
+                cls._recent_quotes[memory_key] = []
+
+            sampled_ids = random.sample(candidate_ids, min(n, len(candidate_ids)))
+            quotes_by_id = {
+                quote.id: quote for quote in await Quote.filter(id__in=sampled_ids)
+            }
+            quotes = [quotes_by_id[i] for i in sampled_ids if i in quotes_by_id]
+            logger.info(
+                f"随机获取到 {len(quotes)} 条候选语录 来自群组 {group_id} (用户: {user_id_filter or '任意'})",
+                "群聊语录",
+            )
+            return quotes
         except Exception as e:
             logger.error(
                 f"随机获取语录时发生错误 - 群组: {group_id}, 用户筛选: {user_id_filter}, 错误: {e}",
                 "群聊语录",
                 e=e,
             )
-            return None
+            return []
+
+    @classmethod
+    def mark_quote_shown(
+        cls, group_id: str, user_id_filter: str | None, quote_id: int
+    ) -> None:
+        """记录语录已被展示，用于短时间内避免重复"""
+        cls._remember_quote(f"{group_id}_{user_id_filter or 'all'}", quote_id)
 
     @classmethod
     async def _search_quotes_by_text_and_filter_by_tags(
-        cls, group_id: str, keyword: str, user_id_filter: str | None = None
+        cls,
+        group_id: str,
+        keyword: str,
+        keywords: list[str],
+        user_id_filter: str | None = None,
     ) -> list[Quote]:
         """
         分阶段搜索语录：
         1. [精确匹配] 首先尝试匹配完整的关键词。
         2. [模糊匹配] 如果没有精确匹配结果，则回退到分词模糊搜索。
+        keyword 为完整关键词，keywords 为已拆分好的关键词列表。
         """
         base_filters = {"group_id": group_id}
         if user_id_filter:
@@ -228,7 +236,6 @@ class QuoteService:
             return exact_matches
 
         logger.info("精确匹配未找到结果，回退到分词模糊搜索...", "群聊语录-搜索")
-        keywords = [k.strip() for k in keyword.split() if k.strip()]
         if not keywords:
             return []
 
@@ -291,9 +298,20 @@ class QuoteService:
 
     @classmethod
     async def search_quote(
-        cls, group_id: str, keyword: str, user_id_filter: str | None = None
+        cls,
+        group_id: str,
+        keyword: str | list[str],
+        user_id_filter: str | None = None,
     ) -> Quote | None:
-        """根据关键词搜索语录，可根据用户筛选。已重构为使用两阶段查询方法。"""
+        """
+        根据关键词搜索语录，可根据用户筛选。已重构为使用两阶段查询方法。
+        keyword 可直接传入命令解析得到的关键词列表，省去拼接后再拆分。
+        """
+        if isinstance(keyword, str):
+            keywords = keyword.split()
+        else:
+            keywords = [k for kw in keyword for k in kw.split()]
+            keyword = " ".join(keywords)
         logger.info(
             f"开始搜索语录 - 群组: {group_id}, 关键词: {keyword}, 用户筛选: {user_id_filter}",
             "群聊语录",
@@ -302,7 +320,7 @@ class QuoteService:
 
         try:
             all_matches = await cls._search_quotes_by_text_and_filter_by_tags(
-                group_id, keyword, user_id_filter
+                group_id, keyword, keywords, user_id_filter
             )
 
             if all_matches:
@@ -339,10 +357,13 @@ class QuoteService:
                 "群聊语录",
             )
 
-            quotes = await Quote.filter(
-                group_id=group_id, image_path__iendswith=image_basename
+            quote = (
+                await Quote.filter(
+                    group_id=group_id, image_path__iendswith=image_basename
+                )
+                .order_by("id")
+                .first()
             )
-            quote = quotes[0] if quotes else None
 
             if quote:
                 logger.info(
@@ -361,6 +382,25 @@ class QuoteService:
             )
             return None
 
+    @staticmethod
+    async def is_quote_uploader(
+        group_id: str, image_basename: str, user_id: str
+    ) -> bool:
+        """直接在数据库中判断指定用户是否为该图片对应语录的上传者"""
+        try:
+            return await Quote.filter(
+                group_id=group_id,
+                image_path__iendswith=image_basename,
+                uploader_user_id=user_id,
+            ).exists()
+        except Exception as e:
+            logger.error(
+                f"检查语录上传者时发生错误 - 群组: {group_id}, 文件名: {image_basename}, 错误: {e}",
+                "群聊语录",
+                e=e,
+            )
+            return False
+
     @staticmethod
     async def get_last_quote(group_id: str) -> Quote | None:
         """获取群组内最后保存的一条语录"""
@@ -441,21 +481,29 @@ class QuoteService:
         else:
             selected_quote = random.choice(quotes)
 
+        cls._remember_quote(memory_key, selected_quote.id)
+        return selected_quote
+
+    @classmethod
+    def _remember_quote(cls, memory_key: str, quote_id: int) -> None:
+        """将语录ID加入近期展示记录，超出上限时移除最早的记录"""
         if memory_key not in cls._recent_quotes:
             cls._recent_quotes[memory_key] = []
 
-        cls._recent_quotes[memory_key].append(selected_quote.id)
+        cls._recent_quotes[memory_key].append(quote_id)
 
         if len(cls._recent_quotes[memory_key]) > cls._max_history_per_key:
             cls._recent_quotes[memory_key].pop(0)
 
-        return selected_quote
-
     @classmethod
     async def search_quotes_for_deletion(
         cls, group_id: str, keywords: list[str] | None = None, **filters: Any
-    ) -> list[Quote]:
-        """根据关键词（OR逻辑）或其他条件搜索语录，用于批量删除。"""
+    ) -> list[tuple[int, str]]:
+        """
+        根据关键词（OR逻辑）或其他条件搜索语录，用于批量删除。
+        删除只需要ID与图片路径，因此只返回 (ID, 图片路径) 元组，不装配模型对象，
+        确认等待期间占用的内存更少。
+        """
         logger.info(
             f"开始搜索语录用于删除 - 群组: {group_id}, 关键词: {keywords}, 过滤器: {filters}",
             "群聊语录",
@@ -476,7 +524,9 @@ class QuoteService:
                     if value is not None:
                         query &= Q(**{key: value})
 
-            final_matched_quotes = await Quote.filter(query)
+            final_matched_quotes: list[tuple[int, str]] = await Quote.filter(
+                query
+            ).values_list("id", "image_path")
 
             logger.info(
                 f"找到 {len(final_matched_quotes)} 条与条件匹配的语录",
@@ -494,8 +544,62 @@ class QuoteService:
             return []
 
     @staticmethod
-    async def find_quotes_from_left_users(group_id: str, bot: Bot) -> list[Quote]:
-        """查找指定群组中由已退群用户产生或记录的语录"""
+    async def bulk_delete_by_ids(ids: list[int], chunk_size: int = 500) -> int:
+        """
+        按ID批量删除语录记录（不处理图片文件）。
+        分块执行 IN 查询以避免语句过长，所有分块在同一事务中提交。
+
+        返回:
+            int: 实际删除的记录数
+        """
+        if not ids:
+            return 0
+
+        deleted_count = 0
+        async with in_transaction(Quote._meta.default_connection) as conn:
+            for i in range(0, len(ids), chunk_size):
+                deleted_count += (
+                    await Quote.filter(id__in=ids[i : i + chunk_size])
+                    .using_db(conn)
+                    .delete()
+                )
+        logger.info(
+            f"批量删除语录完成 - 请求: {len(ids)}，实际删除: {deleted_count}",
+            "群聊语录",
+        )
+        return deleted_count
+
+    @staticmethod
+    async def migrate_legacy_paths() -> int:
+        """
+        启动时一次性将旧版本保存的反斜杠路径统一为正斜杠的相对路径，
+        避免在查询语录时再逐条处理旧格式路径。
+
+        返回:
+            int: 迁移的记录数
+        """
+        legacy_rows = await Quote.filter(image_path__contains="\\").values_list(
+            "id", "image_path"
+        )
+        if not legacy_rows:
+            return 0
+
+        async with in_transaction(Quote._meta.default_connection) as conn:
+            for quote_id, image_path in legacy_rows:
+                normalized = image_path.replace("\\", "/").lstrip("/")
+                await (
+                    Quote.filter(id=quote_id)
+                    .using_db(conn)
+                    .update(image_path=normalized)
+                )
+        logger.info(f"已迁移 {len(legacy_rows)} 条旧格式语录路径", "群聊语录")
+        return len(legacy_rows)
+
+    @staticmethod
+    async def find_quotes_from_left_users(
+        group_id: str, bot: Bot
+    ) -> list[tuple[int, str]]:
+        """查找指定群组中由已退群用户产生或记录的语录，返回 (ID, 图片路径) 元组"""
         logger.info(f"开始查找群组 {group_id} 中已退群用户的语录", "群聊语录")
         try:
             uploaders = await Quote.filter(
@@ -529,7 +633,7 @@ class QuoteService:
                     Q(uploader_user_id__in=list(left_user_ids))
                     | Q(quoted_user_id__in=list(left_user_ids))
                 )
-            ).all()
+            ).values_list("id", "image_path")
 
             return left_user_quotes
         except Exception as e:
@@ -575,20 +679,25 @@ class QuoteService:
             raise e
 
     @staticmethod
-    async def increment_view_count(quote_id: int) -> None:
-        """增加语录的查看次数"""
+    async def increment_view_counts_bulk(view_counts: Mapping[int, int]) -> None:
+        """
+        批量增加语录的查看次数。
+        增量相同的语录合并为一条 UPDATE，通常只需执行一条语句。
+        """
+        ids_by_increment: dict[int, list[int]] = defaultdict(list)
+        for quote_id, increment in view_counts.items():
+            ids_by_increment[increment].append(quote_id)
+
         try:
-            quote = await Quote.get_or_none(id=quote_id)
-            if quote:
-                quote.view_count += 1
-                await quote.save(update_fields=["view_count"])
-                logger.debug(
-                    f"语录ID {quote_id} 查看次数增加到 {quote.view_count}", "群聊语录"
+            for increment, quote_ids in ids_by_increment.items():
+                await Quote.filter(id__in=quote_ids).update(
+                    view_count=F("view_count") + increment
                 )
-        except Exception as e:
-            logger.error(
-                f"增加语录查看次数失败 - ID: {quote_id}, 错误: {e}", "群聊语录", e=e
+            logger.debug(
+                f"批量增加语录查看次数完成 - 语录数: {len(view_counts)}", "群聊语录"
             )
+        except Exception as e:
+            logger.error(f"批量增加语录查看次数失败: {e}", "群聊语录", e=e)
 
     @staticmethod
     async def get_hottest_quotes(group_id: str, limit: int = 10) -> list[Quote]:
@@ -635,37 +744,39 @@ class QuoteService:
 
         logger.info(f"开始使用HTML模板生成群组 {group_id} 的热门语录图片", "群聊语录")
 
+        quoted_user_ids = list(
+            {quote.quoted_user_id for quote in hottest_quotes if quote.quoted_user_id}
+        )
+
+        async def _get_avatar_data_url(user_id: str) -> str:
+            try:
+                avatar_path = await avatar_service.get_avatar_path(
+                    platform="qq", identifier=user_id
+                )
+                if avatar_path:
+                    return await get_image_data_url(avatar_path)
+            except Exception as e:
+                logger.warning(f"获取用户 {user_id} 头像失败: {e}", "群聊语录")
+            return ""
+
+        avatar_results, user_infos = await asyncio.gather(
+            asyncio.gather(*(_get_avatar_data_url(uid) for uid in quoted_user_ids)),
+            GroupInfoUser.filter(group_id=group_id, user_id__in=quoted_user_ids),
+        )
+        avatar_data_urls = dict(zip(quoted_user_ids, avatar_results))
+        user_names = {
+            user_info.user_id: user_info.user_name or user_info.nickname
+            for user_info in user_infos
+        }
+
         quote_cards_data = []
 
         for i, quote in enumerate(hottest_quotes):
-            avatar_base64 = ""
-            if quote.quoted_user_id:
-                try:
-                    avatar_path = await avatar_service.get_avatar_path(
-                        platform="qq", identifier=quote.quoted_user_id
-                    )
-                    if avatar_path:
-                        async with aiofiles.open(avatar_path, "rb") as f:
-                            avatar_data = await f.read()
-                        avatar_base64 = base64.b64encode(avatar_data).decode("utf-8")
-                except Exception as e:
-                    logger.warning(
-                        f"获取用户 {quote.quoted_user_id} 头像失败: {e}", "群聊语录"
-                    )
-
+            avatar_data_url = ""
             user_name = ""
             if quote.quoted_user_id:
-                user_info = await GroupInfoUser.get_or_none(
-                    user_id=quote.quoted_user_id, group_id=quote.group_id
-                )
-                if user_info:
-                    user_name = (
-                        user_info.user_name
-                        or user_info.nickname
-                        or quote.quoted_user_id
-                    )
-                else:
-                    user_name = quote.quoted_user_id
+                avatar_data_url = avatar_data_urls.get(quote.quoted_user_id, "")
+                user_name = user_names.get(quote.quoted_user_id) or quote.quoted_user_id
 
             is_image_quote = quote.image_path and not (
                 quote.ocr_text or quote.recorded_text
@@ -685,9 +796,7 @@ class QuoteService:
             card_data = HotQuoteItemData(
                 rank=i + 1,
                 user_name=user_name,
-                avatar_data_url=f"data:image/png;base64,{avatar_base64}"
-                if avatar_base64
-                else "",
+                avatar_data_url=avatar_data_url,
                 preview_text=preview_text,
                 is_image_quote=is_image_quote,
                 image_path=image_path,
@@ -750,17 +859,17 @@ class QuoteService:
         ]
         counts = [item.get("upload_count") or item.get("quote_count") for item in data]
 
-        user_names = []
-        for uid in user_ids:
-            if not uid:
-                user_names.append("未知用户")
-                continue
-            user_info = await GroupInfoUser.get_or_none(
-                group_id=group_id, user_id=str(uid)
-            )
-            user_names.append(
-                user_info.user_name if user_info and user_info.user_name else str(uid)
-            )
+        user_infos = await GroupInfoUser.filter(
+            group_id=group_id, user_id__in=[str(uid) for uid in user_ids if uid]
+        )
+        name_map = {
+            user_info.user_id: user_info.user_name
+            for user_info in user_infos
+            if user_info.user_name
+        }
+        user_names = [
+            name_map.get(str(uid), str(uid)) if uid else "未知用户" for uid in user_ids
+        ]
 
         user_names.reverse()
         counts.reverse()
@@ -784,8 +893,8 @@ class QuoteService:
             logger.debug("分词文本为空", "群聊语录")
             return []
 
-        cut_words = seg.cut(text)
-        cut_words_list: list[str] = list(set(str(word) for word in cut_words))
+        cut_words = _get_segmenter().cut(text)
+        unique_words: set[str] = {str(word) for word in cut_words}
 
         punctuation = ".,!?:;。，！？：；%$\n []()（）《》<>「」'''-_+=*&^#@~`"
         stopwords = [
@@ -822,7 +931,7 @@ class QuoteService:
 
         new_words: list[str] = [
             word
-            for word in cut_words_list
+            for word in unique_words
             if word not in remove_set and len(word.strip()) > 0
         ]
 
@@ -0,0 +1,147 @@
+import asyncio
+from collections import OrderedDict
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import ClassVar
+import uuid
+
+import aiofiles
+import aiofiles.os
+
+from zhenxun import ui
+from zhenxun.configs.config import Config
+from zhenxun.services.log import logger
+from zhenxun.ui.models import RenderableComponent
+from zhenxun.utils.pydantic_compat import model_dump
+
+from ..config import get_render_cache_path
+from ..utils.image_utils import safe_unlink
+
+
+class RenderCacheService:
+    """
+    语录卡片渲染结果缓存，按渲染数据内容寻址。
+    缓存文件的大小与最近使用顺序保存在内存索引中，命中与淘汰时无需扫描目录。
+    """
+
+    _cache_version: ClassVar[str] = "1"
+    _default_max_bytes: ClassVar[int] = 100 * 1024 * 1024
+
+    _index: ClassVar["OrderedDict[str, int] | None"] = None
+    """文件名 -> 文件大小，按最近使用时间从旧到新排列"""
+    _total_bytes: ClassVar[int] = 0
+    _index_lock: ClassVar[asyncio.Lock] = asyncio.Lock()
+
+    @classmethod
+    def _cache_key(cls, component: RenderableComponent) -> str:
+        """根据模板、缓存版本与渲染数据计算缓存键"""
+        data = json.dumps(
+            model_dump(component), sort_keys=True, ensure_ascii=False, default=str
+        )
+        payload = f"{component.template_name}|{cls._cache_version}|{data}"
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    @staticmethod
+    def _scan(cache_dir: Path) -> "OrderedDict[str, int]":
+        """扫描缓存目录建立索引，并清理上次异常退出时残留的临时文件"""
+        entries: list[tuple[float, str, int]] = []
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if not entry.is_file():
+                    continue
+                if entry.name.endswith(".tmp"):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_atime, entry.name, stat.st_size))
+        entries.sort()
+        return OrderedDict((name, size) for _, name, size in entries)
+
+    @classmethod
+    async def _ensure_index(cls, cache_dir: Path) -> "OrderedDict[str, int]":
+        """首次使用时在线程中扫描一次缓存目录"""
+        if cls._index is None:
+            async with cls._index_lock:
+                if cls._index is None:
+                    index = await asyncio.to_thread(cls._scan, cache_dir)
+                    cls._total_bytes = sum(index.values())
+                    cls._index = index
+        return cls._index
+
+    @classmethod
+    def _record(cls, index: "OrderedDict[str, int]", name: str, size: int) -> None:
+        """将缓存文件记为最近使用"""
+        cls._total_bytes += size - index.pop(name, 0)
+        index[name] = size
+
+    @classmethod
+    async def render(cls, component: RenderableComponent) -> bytes:
+        """渲染组件，相同内容直接返回缓存的图片"""
+        cache_dir = get_render_cache_path()
+        name = f"{cls._cache_key(component)}.png"
+        cache_file = cache_dir / name
+        index = await cls._ensure_index(cache_dir)
+
+        try:
+            async with aiofiles.open(cache_file, "rb") as f:
+                img_data = await f.read()
+            cls._record(index, name, len(img_data))
+            logger.debug(f"使用渲染缓存: {name}", "群聊语录")
+            return img_data
+        except FileNotFoundError:
+            cls._total_bytes -= index.pop(name, 0)
+
+        img_data = await ui.render(component)
+
+        # 先写入同目录下的临时文件再原子替换，并发命中时不会读到写了一半的图片
+        temp_file = cache_dir / f"{name}.{uuid.uuid4().hex}.tmp"
+        try:
+            async with aiofiles.open(temp_file, "wb") as f:
+                await f.write(img_data)
+            await aiofiles.os.replace(temp_file, cache_file)
+            cls._record(index, name, len(img_data))
+            await cls._evict(cache_dir, index, keep=name)
+        except Exception as e:
+            logger.warning(f"写入渲染缓存失败: {e}", "群聊语录", e=e)
+            await safe_unlink(temp_file)
+
+        return img_data
+
+    @classmethod
+    async def _evict(
+        cls, cache_dir: Path, index: "OrderedDict[str, int]", keep: str
+    ) -> None:
+        """缓存总大小超出上限时，按最近使用顺序淘汰最旧的文件"""
+        max_bytes = Config.get_config(
+            "quote", "QUOTE_CACHE_MAX_BYTES", cls._default_max_bytes
+        )
+        victims: list[str] = []
+        while cls._total_bytes > max_bytes and len(index) > 1:
+            name, size = next(iter(index.items()))
+            if name == keep:
+                break
+            del index[name]
+            cls._total_bytes -= size
+            victims.append(name)
+
+        if victims:
+            await asyncio.to_thread(cls._remove_files, cache_dir, victims)
+            logger.debug(
+                f"渲染缓存淘汰 {len(victims)} 个文件，当前大小: {cls._total_bytes} 字节",
+                "群聊语录",
+            )
+
+    @staticmethod
+    def _remove_files(cache_dir: Path, names: list[str]) -> None:
+        for name in names:
+            try:
+                os.remove(cache_dir / name)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"淘汰渲染缓存失败: {name}, 错误: {e}", "群聊语录")
@@ -0,0 +1,66 @@
+import asyncio
+from collections import Counter
+from collections.abc import Coroutine
+from typing import Any, ClassVar
+
+from zhenxun.services.log import logger
+
+from .quote_service import QuoteService
+
+
+class ViewCountService:
+    """
+    语录查看次数的合并写入服务。
+    查看次数先在内存中累计，短时间窗口结束或累计数量达到上限时一次性写入数据库，
+    避免热门群聊中每次发送语录都单独执行一条 UPDATE。
+    """
+
+    _flush_interval: ClassVar[float] = 0.2
+    _max_pending: ClassVar[int] = 64
+
+    _pending: ClassVar[Counter[int]] = Counter()
+    _pending_total: ClassVar[int] = 0
+    _flush_scheduled: ClassVar[bool] = False
+    _tasks: ClassVar[set[asyncio.Task]] = set()
+
+    @classmethod
+    def submit(cls, quote_id: int) -> None:
+        """记录一次查看，无需等待写入完成"""
+        cls._pending[quote_id] += 1
+        cls._pending_total += 1
+
+        if cls._pending_total >= cls._max_pending:
+            cls._spawn(cls.flush())
+        elif not cls._flush_scheduled:
+            cls._flush_scheduled = True
+            cls._spawn(cls._delayed_flush())
+
+    @classmethod
+    def _spawn(cls, coro: Coroutine[Any, Any, None]) -> None:
+        task = asyncio.create_task(coro)
+        cls._tasks.add(task)
+        task.add_done_callback(cls._tasks.discard)
+
+    @classmethod
+    async def _delayed_flush(cls) -> None:
+        await asyncio.sleep(cls._flush_interval)
+        cls._flush_scheduled = False
+        await cls.flush()
+
+    @classmethod
+    async def flush(cls) -> None:
+        """将累计的查看次数写入数据库"""
+        if not cls._pending:
+            return
+        pending = cls._pending
+        cls._pending = Counter()
+        cls._pending_total = 0
+        await QuoteService.increment_view_counts_bulk(pending)
+
+    @classmethod
+    async def shutdown(cls) -> None:
+        """关闭前等待进行中的写入，并写入尚未落库的查看次数"""
+        if cls._tasks:
+            await asyncio.gather(*cls._tasks, return_exceptions=True)
+        await cls.flush()
+        logger.debug("语录查看次数已全部写入", "群聊语录")
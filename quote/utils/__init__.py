@@ -8,10 +8,14 @@ from .image_utils import (
     convert_image_to_png,
     copy_images_files,
     get_img_hash,
+    get_image_data_url,
     get_img_hash_from_bytes,
     get_img_md5,
+    link_or_copy_file,
+    safe_unlink,
     save_image_from_url,
 )
+from .session_utils import get_cached_target, get_group_id_from_session
 
 __all__ = [
     "ImageProcessError",
@@ -21,7 +25,12 @@ __all__ = [
     "convert_image_to_png",
     "copy_images_files",
     "get_img_hash",
+    "get_cached_target",
+    "get_group_id_from_session",
+    "get_image_data_url",
     "get_img_hash_from_bytes",
     "get_img_md5",
+    "link_or_copy_file",
+    "safe_unlink",
     "save_image_from_url",
 ]
@@ -1,9 +1,14 @@
+import asyncio
+import base64
 import hashlib
 import io
 import os
 from pathlib import Path
+import shutil
 
 import aiofiles
+import aiofiles.os
+from cachetools import LRUCache
 import imagehash
 from PIL import Image
 
@@ -15,6 +20,10 @@ from .exceptions import NetworkError
 IMAGE_EXTENSIONS = [".jpg", ".jpeg", ".png", ".gif"]
 DEFAULT_AVATAR_MD5 = "acef72340ac0e914090bd35799f5594e"
 
+# 按 Base64 字符串总长度（ASCII，即字节数）限制缓存大小
+_DATA_URL_CACHE_MAX_BYTES = 32 * 1024 * 1024
+_data_url_cache: LRUCache = LRUCache(maxsize=_DATA_URL_CACHE_MAX_BYTES, getsizeof=len)
+
 
 async def save_image_from_url(url: str, save_path: str | Path) -> str:
     """下载并保存图片"""
@@ -55,6 +64,45 @@ async def get_img_md5(img_path: str | Path) -> str:
     return md5
 
 
+async def get_image_data_url(img_path: str | Path) -> str:
+    """读取图片并转换为 Base64 数据URI，按文件路径与修改时间缓存结果"""
+    stat = await aiofiles.os.stat(img_path)
+    cache_key = (str(img_path), stat.st_mtime_ns)
+    if (data_url := _data_url_cache.get(cache_key)) is not None:
+        return data_url
+
+    async with aiofiles.open(img_path, "rb") as f:
+        img_data = await f.read()
+    data_url = f"data:image/png;base64,{base64.b64encode(img_data).decode('utf-8')}"
+    if len(data_url) <= _DATA_URL_CACHE_MAX_BYTES:
+        _data_url_cache[cache_key] = data_url
+    return data_url
+
+
+async def safe_unlink(path: str | Path) -> None:
+    """异步删除文件，文件不存在时视为删除成功"""
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        # 跨设备、目标已存在或文件系统不支持硬链接时回退为复制
+        shutil.copyfile(src, dst)
+
+
+async def link_or_copy_file(src: str | Path, dst: str | Path) -> None:
+    """
+    将本地文件保存到目标路径，优先创建硬链接，失败时回退为复制。
+    两种方式都由系统完成，不经过 Python 层的读写缓冲。
+    """
+    await asyncio.to_thread(_link_or_copy, str(src), str(dst))
+
+
 async def _calculate_phash(img_data: bytes) -> str:
     """内部函数：从字节数据计算图片的感知哈希值"""
     try:
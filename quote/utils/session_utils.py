@@ -0,0 +1,28 @@
+import functools
+
+from nonebot_plugin_alconna import Target
+
+from zhenxun.utils.platform import PlatformUtils
+
+
+@functools.lru_cache(maxsize=1024)
+def get_group_id_from_session(session_id: str) -> str | None:
+    """
+    从会话ID中解析群号。
+    OneBot v11 群聊会话ID格式为 group_{群号}_{用户ID}，非群聊会话返回 None。
+    活跃群聊的会话ID高度重复，因此缓存解析结果。
+    """
+    if "group" not in session_id:
+        return None
+    return session_id.partition("_")[2].partition("_")[0] or None
+
+
+@functools.lru_cache(maxsize=4096)
+def get_cached_target(
+    group_id: str | None = None, user_id: str | None = None
+) -> Target | None:
+    """
+    获取消息发送目标并缓存。
+    同一 (群号, 用户ID) 对应的发送目标在进程生命周期内不会变化。
+    """
+    return PlatformUtils.get_target(group_id=group_id, user_id=user_id)